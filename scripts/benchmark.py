@@ -0,0 +1,441 @@
+"""Benchmark harness for the ingest pipeline and the tutor.
+
+Generates synthetic corpora in a throwaway sandbox, runs the real scripts
+against them and writes the measurements as JSON so runs can be compared:
+
+    py scripts/benchmark.py                      # full run, default scale
+    py scripts/benchmark.py --scale 0.2 --only ingest
+    py scripts/benchmark.py --compare benchmarks/<older>.json
+
+Tutor turns are timed against a stub Ollama HTTP server with a configurable
+per-token delay, so numbers reflect the tutor's own overhead rather than
+the model.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from contextlib import redirect_stdout
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+try:
+    import resource  # Unix only — peak RSS is reported as null elsewhere
+except ImportError:
+    resource = None
+
+# --- CONFIGURATION ---
+SCRIPTS_DIR = Path(__file__).parent
+BASE_DIR = SCRIPTS_DIR.parent
+RESULTS_DIR = BASE_DIR / "benchmarks"
+STUB_TOKENS = 20          # Tokens in every stub answer
+STUB_DELAY = 0.02         # Seconds between stub tokens
+TURNS = 5                 # Tutor turns per streamed / non-streamed run
+BENCH_QUESTION = "Explain how a for loop works in JavaScript"
+
+
+# ── Synthetic Corpora ────────────────────────────────────────────
+
+def require_fitz():
+    try:
+        import fitz
+    except ImportError:
+        sys.exit("❌ Generating PDFs needs PyMuPDF. Run: py -m pip install PyMuPDF")
+    return fitz
+
+
+def make_text_pdf(path, pages, label):
+    fitz = require_fitz()
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        page = doc.new_page()
+        text = f"{label} page {number}\n" + " ".join(f"word{i % 97}" for i in range(300))
+        page.insert_textbox(fitz.Rect(54, 54, 540, 780), text, fontsize=9)
+    doc.save(str(path))
+    doc.close()
+
+
+def make_image_pdf(path, pages, images_per_page, size=256):
+    """Pages of noise images — incompressible and all distinct, so none are deduplicated."""
+    fitz = require_fitz()
+    doc = fitz.open()
+    for number in range(1, pages + 1):
+        page = doc.new_page()
+        page.insert_text((54, 54), f"{path.stem} page {number}")
+        for slot in range(images_per_page):
+            pix = fitz.Pixmap(fitz.csRGB, size, size, os.urandom(size * size * 3), False)
+            top = 80 + slot * 220
+            page.insert_image(fitz.Rect(54, top, 254, top + 200), stream=pix.tobytes("png"))
+    doc.save(str(path))
+    doc.close()
+
+
+def make_nested_zip(path, scale, scratch):
+    """Outer zip: PDFs, code files and an inner zip with more of both."""
+    scratch.mkdir(parents=True, exist_ok=True)
+    pdfs = []
+    for i in range(max(1, round(3 * scale))):
+        pdf = scratch / f"chapter{i + 1}.pdf"
+        make_text_pdf(pdf, max(1, round(20 * scale)), pdf.stem)
+        pdfs.append(pdf)
+
+    inner = scratch / "inner.zip"
+    with zipfile.ZipFile(inner, "w", zipfile.ZIP_DEFLATED) as z:
+        for pdf in pdfs[:2]:
+            z.write(pdf, f"extra/{pdf.stem}_copy.pdf")
+        for i in range(max(1, round(25 * scale))):
+            z.writestr(f"extra/src/module{i}.py", f"def f{i}():\n    return {i}\n")
+
+    with zipfile.ZipFile(path, "w", zipfile.ZIP_DEFLATED) as z:
+        for pdf in pdfs:
+            z.write(pdf, f"docs/{pdf.name}")
+        for i in range(max(1, round(50 * scale))):
+            z.writestr(f"src/lesson{i}.js", f"console.log({i});\n")
+        z.write(inner, "bundles/inner.zip")
+        z.writestr("__MACOSX/._junk", "x")
+    shutil.rmtree(scratch)
+
+
+def make_workspace(work_dir, dirs, files_per_dir):
+    """A wide project tree plus a little course material for retrieval."""
+    exts = [".js", ".py", ".css", ".html", ".md", ".json", ".png"]
+    for d in range(dirs):
+        folder = work_dir / f"week{d // 10:02d}" / f"lab{d:03d}"
+        folder.mkdir(parents=True, exist_ok=True)
+        for f in range(files_per_dir):
+            (folder / f"file{f:03d}{exts[f % len(exts)]}").write_text(f"// {d}/{f}\n", encoding="utf-8")
+    context = work_dir / "00_readings_and_context"
+    context.mkdir(parents=True, exist_ok=True)
+    for topic in ("loops", "functions", "arrays", "objects"):
+        body = "\n\n".join(f"## {topic.title()} {i}\n\nA {topic} example in JavaScript, part {i}."
+                           for i in range(20))
+        (context / f"{topic}.md").write_text(f"# {topic}\n\n{body}\n", encoding="utf-8")
+
+
+def make_sandbox(root):
+    """A copy of the project scripts with its own inbox and workspace."""
+    shutil.copytree(SCRIPTS_DIR, root / "scripts", ignore=shutil.ignore_patterns("__pycache__"))
+    if (BASE_DIR / "TUTOR_PROMPT.md").exists():
+        shutil.copy(BASE_DIR / "TUTOR_PROMPT.md", root / "TUTOR_PROMPT.md")
+    (root / "00_inbox").mkdir()
+    return root
+
+
+# ── Measurement Helpers ──────────────────────────────────────────
+
+def peak_rss_mb(who):
+    """Largest resident set size of this process or its waited-for children, in MB."""
+    if resource is None:
+        return None
+    usage = resource.getrusage(resource.RUSAGE_SELF if who == "self" else resource.RUSAGE_CHILDREN)
+    divisor = 1024 * 1024 if sys.platform == "darwin" else 1024  # macOS reports bytes, Linux KB
+    return round(usage.ru_maxrss / divisor, 1)
+
+
+def run_child(args, cwd=None):
+    """Run this script in a child mode and return the JSON it prints last."""
+    result = subprocess.run([sys.executable, str(Path(__file__).resolve())] + args, cwd=cwd,
+                            capture_output=True, text=True, encoding="utf-8",
+                            env=dict(os.environ, PYTHONIOENCODING="utf-8"))
+    if result.returncode != 0:
+        raise RuntimeError(f"child {args[:2]} failed:\n{result.stderr[-2000:]}")
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def child_measure_rss(command):
+    """Child mode: run a command, then report its wall time and peak RSS (incl. its workers)."""
+    start = time.perf_counter()
+    result = subprocess.run(command, capture_output=True, text=True, encoding="utf-8", errors="replace")
+    print(json.dumps({"seconds": time.perf_counter() - start, "returncode": result.returncode,
+                      "peak_rss_mb": peak_rss_mb("children"), "tail": result.stdout[-1500:]}))
+
+
+# ── Ingest ───────────────────────────────────────────────────────
+
+def bench_ingest(sandbox_root, scale, workers):
+    scenarios = {}
+    text_pages = max(1, round(100 * scale))
+    image_pages, per_page = max(1, round(20 * scale)), 3
+
+    builders = {
+        "text_pdfs": lambda inbox: [make_text_pdf(inbox / f"reader{i}.pdf", text_pages, f"reader{i}")
+                                    for i in range(4)],
+        "image_pdfs": lambda inbox: [make_image_pdf(inbox / f"slides{i}.pdf", image_pages, per_page)
+                                     for i in range(2)],
+        "nested_zips": lambda inbox: make_nested_zip(inbox / "course_bundle.zip", scale,
+                                                     inbox.parent / "zip_scratch"),
+    }
+    for name, build in builders.items():
+        sandbox = make_sandbox(sandbox_root / f"ingest_{name}")
+        inbox = sandbox / "00_inbox"
+        build(inbox)
+        input_bytes = sum(p.stat().st_size for p in inbox.rglob("*") if p.is_file())
+
+        fitz = require_fitz()
+        pages = 0
+        for pdf in inbox.glob("*.pdf"):
+            with fitz.open(str(pdf)) as doc:
+                pages += doc.page_count
+
+        command = [sys.executable, str(sandbox / "scripts" / "ingest.py"), "--workers", str(workers), "--no-ocr"]
+        run = run_child(["--child", "rss", "--"] + command, cwd=sandbox)
+        context = sandbox / "01_active_lab" / "00_readings_and_context"
+        if name == "nested_zips":
+            pages = sum(md.read_text(encoding="utf-8").count("## Page ") for md in context.glob("*.md"))
+        images = len([p for p in (context / "images").glob("img_*")]) if (context / "images").exists() else 0
+
+        seconds = run["seconds"]
+        scenarios[name] = {
+            "seconds": round(seconds, 3),
+            "input_mb": round(input_bytes / 2**20, 2),
+            "pages": pages,
+            "pages_per_sec": round(pages / seconds, 1) if seconds else None,
+            "images": images,
+            "images_per_sec": round(images / seconds, 1) if seconds else None,
+            "peak_rss_mb": run["peak_rss_mb"],
+            "ok": run["returncode"] == 0,
+        }
+        status = "✅" if run["returncode"] == 0 else "❌"
+        print(f"  {status} ingest {name:<12} {seconds:6.2f}s  {pages} pages, {images} images, "
+              f"peak RSS {run['peak_rss_mb']} MB")
+    return scenarios
+
+
+# ── Stub Ollama ──────────────────────────────────────────────────
+
+class StubOllama:
+    """Minimal Ollama HTTP API: /api/chat (streamed or not) and /api/generate."""
+
+    def __init__(self, delay=STUB_DELAY, tokens=STUB_TOKENS):
+        self.delay, self.tokens = delay, tokens
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, *args):
+                pass
+
+            def reply(self, payload):
+                data = json.dumps(payload).encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(data)))
+                self.end_headers()
+                self.wfile.write(data)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                final = {"model": body.get("model", "stub"), "created_at": "2024-01-01T00:00:00Z",
+                         "done": True, "load_duration": 0, "prompt_eval_count": 0,
+                         "eval_count": stub.tokens, "eval_duration": int(stub.delay * stub.tokens * 1e9)}
+                if self.path != "/api/chat":
+                    self.reply(dict(final, response=""))
+                    return
+                words = [f"word{i} " for i in range(stub.tokens)]
+                if not body.get("stream"):
+                    time.sleep(stub.delay * stub.tokens)
+                    self.reply(dict(final, message={"role": "assistant", "content": "".join(words)}))
+                    return
+                self.send_response(200)
+                self.send_header("Content-Type", "application/x-ndjson")
+                self.end_headers()
+                for word in words:
+                    time.sleep(stub.delay)
+                    chunk = {"model": final["model"], "created_at": final["created_at"], "done": False,
+                             "message": {"role": "assistant", "content": word}}
+                    self.wfile.write((json.dumps(chunk) + "\n").encode())
+                    self.wfile.flush()
+                self.wfile.write((json.dumps(dict(final, message={"role": "assistant", "content": ""})) + "\n").encode())
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self.port = self.server.server_address[1]
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        return self
+
+    def __exit__(self, *exc):
+        self.server.shutdown()
+
+
+# ── Tutor ────────────────────────────────────────────────────────
+
+def timed(fn, *args):
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        result = fn(*args)
+    return time.perf_counter() - start, result
+
+
+def child_tutor(sandbox, port, turns):
+    """Child mode: time workspace mapping, scan and tutor turns inside the sandbox."""
+    os.chdir(sandbox)
+    sys.path.insert(0, str(sandbox / "scripts"))
+    import_start = time.perf_counter()
+    import tutor
+    import ollama
+    results = {"import_seconds": round(time.perf_counter() - import_start, 4)}
+
+    app = tutor.HybridTutor()
+    app._ollama_client = ollama.Client(host=f"http://127.0.0.1:{port}")
+    app.workspace.refresh()
+    results["workspace_files"] = len(app.workspace.files())
+
+    for label in ("cold", "warm"):
+        if label == "cold":
+            tutor.WORKSPACE_INDEX_PATH.unlink(missing_ok=True)
+            app.workspace = tutor.WorkspaceIndex(tutor.WORK_DIR, tutor.WORKSPACE_INDEX_PATH)
+        seconds, _ = timed(app.build_workspace_map)
+        results[f"build_workspace_map_{label}_seconds"] = round(seconds, 4)
+    for label in ("first", "repeat"):
+        seconds, _ = timed(app.scan_workspace, "", 1)
+        results[f"scan_{label}_seconds"] = round(seconds, 4)
+        seconds, _ = timed(app.scan_workspace, "*.js", 1)
+        results[f"scan_filter_{label}_seconds"] = round(seconds, 4)
+
+    app.mode = "local"
+    app.use_cache = False
+    for stream in (True, False):
+        app.stream = stream
+        latencies, first_tokens = [], []
+        for i in range(turns):
+            question = f"{BENCH_QUESTION} (variant {i})"
+            app.history.clear()
+            seconds, _ = timed(app.run_turn, question, app.route_turn(question))
+            latencies.append(seconds)
+            if app.stream_stats and app.stream_stats["ttft"] is not None:
+                first_tokens.append(app.stream_stats["ttft"])
+        key = "turn_streamed" if stream else "turn_blocking"
+        results[key] = {
+            "p50_seconds": round(statistics.median(latencies), 4),
+            "max_seconds": round(max(latencies), 4),
+            "first_token_p50_seconds": round(statistics.median(first_tokens), 4) if first_tokens else None,
+        }
+    results["peak_rss_mb"] = peak_rss_mb("self")
+    print(json.dumps(results))
+
+
+def bench_tutor(sandbox_root, scale, turns, delay, tokens):
+    sandbox = make_sandbox(sandbox_root / "tutor")
+    work_dir = sandbox / "01_active_lab"
+    dirs, per_dir = max(1, round(100 * scale)), 50
+    make_workspace(work_dir, dirs, per_dir)
+
+    with StubOllama(delay, tokens) as stub:
+        results = run_child(["--child", "tutor", "--sandbox", str(sandbox), "--port", str(stub.port),
+                             "--turns", str(turns)])
+    model_time = delay * tokens
+    for key in ("turn_streamed", "turn_blocking"):
+        results[key]["overhead_p50_seconds"] = round(results[key]["p50_seconds"] - model_time, 4)
+    results["stub"] = {"delay_seconds": delay, "tokens": tokens}
+    print(f"  ✅ workspace map  {results['build_workspace_map_cold_seconds'] * 1000:7.1f} ms cold, "
+          f"{results['build_workspace_map_warm_seconds'] * 1000:.1f} ms warm ({results['workspace_files']} files)")
+    print(f"  ✅ scan           {results['scan_first_seconds'] * 1000:7.1f} ms first, "
+          f"{results['scan_repeat_seconds'] * 1000:.1f} ms repeat")
+    print(f"  ✅ turn latency   {results['turn_streamed']['p50_seconds']:7.3f}s streamed p50, "
+          f"{results['turn_blocking']['p50_seconds']:.3f}s blocking p50 (stub model time {model_time:.2f}s)")
+    return results
+
+
+# ── Reporting ────────────────────────────────────────────────────
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=BASE_DIR,
+                              capture_output=True, text=True).stdout.strip() or None
+    except OSError:
+        return None
+
+
+def flatten(data, prefix=""):
+    flat = {}
+    for key, value in data.items():
+        name = f"{prefix}.{key}" if prefix else key
+        if isinstance(value, dict):
+            flat.update(flatten(value, name))
+        elif isinstance(value, (int, float)) and not isinstance(value, bool):
+            flat[name] = value
+    return flat
+
+
+def compare(old_path, new):
+    """Print metrics that changed by more than 5% against an older result file."""
+    with open(old_path, "r", encoding="utf-8") as f:
+        old = json.load(f)
+    before, after = flatten(old.get("results", {})), flatten(new["results"])
+    print(f"\n📊 vs {old_path} ({old.get('commit')} → {new.get('commit')}):")
+    shown = 0
+    for name in sorted(before.keys() & after.keys()):
+        a, b = before[name], after[name]
+        if not a or abs(b - a) / abs(a) < 0.05:
+            continue
+        print(f"  {name:<50} {a:>10} → {b:<10} ({(b - a) / abs(a):+.0%})")
+        shown += 1
+    if not shown:
+        print("  No metric moved by more than 5%.")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Benchmark ingest and tutor performance.")
+    parser.add_argument("--scale", type=float, default=1.0, help="Corpus size multiplier (default 1.0)")
+    parser.add_argument("--only", choices=["ingest", "tutor"], help="Run one part only")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Ingest worker processes")
+    parser.add_argument("--turns", type=int, default=TURNS, help=f"Tutor turns per mode (default {TURNS})")
+    parser.add_argument("--stub-delay", type=float, default=STUB_DELAY, help="Stub seconds per token")
+    parser.add_argument("--stub-tokens", type=int, default=STUB_TOKENS, help="Tokens per stub answer")
+    parser.add_argument("--output", type=Path, help="Result file (default benchmarks/<timestamp>.json)")
+    parser.add_argument("--compare", type=Path, help="Older result file to diff against")
+    parser.add_argument("--keep", action="store_true", help="Keep the sandbox for inspection")
+    parser.add_argument("--child", choices=["rss", "tutor"], help=argparse.SUPPRESS)
+    parser.add_argument("--sandbox", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    parser.add_argument("command", nargs="*", help=argparse.SUPPRESS)
+    return parser.parse_args()
+
+
+def main():
+    args = parse_args()
+    if args.child == "rss":
+        child_measure_rss(args.command)
+        return
+    if args.child == "tutor":
+        child_tutor(args.sandbox, args.port, args.turns)
+        return
+
+    print(f"🏁 Study Buddy benchmark (scale {args.scale}, {args.workers} ingest workers)")
+    sandbox_root = Path(tempfile.mkdtemp(prefix="studybuddy-bench-"))
+    report = {"timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"), "commit": git_commit(),
+              "python": platform.python_version(), "platform": platform.platform(),
+              "cpu_count": os.cpu_count(), "scale": args.scale, "workers": args.workers, "results": {}}
+    try:
+        if args.only in (None, "ingest"):
+            report["results"]["ingest"] = bench_ingest(sandbox_root, args.scale, args.workers)
+        if args.only in (None, "tutor"):
+            report["results"]["tutor"] = bench_tutor(sandbox_root, args.scale, args.turns,
+                                                     args.stub_delay, args.stub_tokens)
+    finally:
+        if args.keep:
+            print(f"📁 Sandbox kept: {sandbox_root}")
+        else:
+            shutil.rmtree(sandbox_root, ignore_errors=True)
+
+    output = args.output or RESULTS_DIR / f"{time.strftime('%Y%m%d-%H%M%S')}.json"
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w", encoding="utf-8") as f:
+        json.dump(report, f, indent=2)
+    print(f"💾 Results → {output}")
+    if args.compare:
+        compare(args.compare, report)
+
+
+if __name__ == "__main__":
+    main()
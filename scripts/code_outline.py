@@ -0,0 +1,246 @@
+import ast
+import hashlib
+import json
+import re
+from pathlib import Path
+
+OUTLINE_VERSION = 1       # Bump when an extractor changes so cached outlines are rebuilt
+OUTLINE_MAX_ENTRIES = 150  # Symbols listed by a plain `read`; the rest are counted
+OUTLINE_NAME_CHARS = 100  # Long names (minified selectors, generated code) are cut
+OUTLINE_MORE_CHARS = 20    # Room kept for the "… N more" row
+
+JS_EXTS = {'.js', '.ts', '.jsx', '.tsx'}
+JS_KEYWORDS = {'if', 'for', 'while', 'switch', 'catch', 'function', 'return', 'with', 'else'}
+JS_DEFINITIONS = [
+    ("function", re.compile(r"^\s*(?:export\s+(?:default\s+)?)?(?:async\s+)?function\s*\*?\s*([A-Za-z_$][\w$]*)\s*\(")),
+    ("class", re.compile(r"^\s*(?:export\s+(?:default\s+)?)?class\s+([A-Za-z_$][\w$]*)")),
+    ("function", re.compile(r"^\s*(?:export\s+)?(?:const|let|var)\s+([A-Za-z_$][\w$]*)\s*=\s*"
+                            r"(?:async\s+)?(?:function\b|\([^)]*\)\s*=>|[A-Za-z_$][\w$]*\s*=>)")),
+]
+JS_METHOD = re.compile(r"^\s+(?:static\s+)?(?:async\s+)?(?:get\s+|set\s+)?\*?([A-Za-z_$][\w$]*)\s*\([^)]*\)\s*\{")
+HTML_BLOCK = re.compile(r"<(script|style)\b[^>]*>", re.IGNORECASE)
+HTML_ID = re.compile(r"<([a-zA-Z][\w-]*)\b[^>]*\bid=[\"']([^\"']+)[\"']")
+
+
+def block_end(lines, start):
+    """Index of the line that closes the first `{` block opening at or after lines[start].
+
+    Skips braces inside quotes and // or /* */ comments — close enough for
+    an outline; an unbalanced file just runs to its last line.
+    """
+    depth, opened, quote, block_comment = 0, False, None, False
+    for index in range(start, len(lines)):
+        line, i = lines[index], 0
+        while i < len(line):
+            char = line[i]
+            if block_comment:
+                if line.startswith("*/", i):
+                    block_comment, i = False, i + 1
+            elif quote:
+                if char == "\\":
+                    i += 1
+                elif char == quote:
+                    quote = None
+            elif line.startswith("//", i):
+                break
+            elif line.startswith("/*", i):
+                block_comment, i = True, i + 1
+            elif char in "\"'`":
+                quote = char
+            elif char == "{":
+                depth, opened = depth + 1, True
+            elif char == "}":
+                depth -= 1
+                if opened and depth == 0:
+                    return index
+            i += 1
+        if quote != "`":
+            quote = None  # Plain strings never span lines
+    return len(lines) - 1
+
+
+def outline_python(text):
+    try:
+        tree = ast.parse(text)
+    except (SyntaxError, ValueError):
+        return []
+    symbols = []
+
+    def visit(nodes, prefix):
+        for node in nodes:
+            if isinstance(node, (ast.FunctionDef, ast.AsyncFunctionDef, ast.ClassDef)):
+                start = min([node.lineno] + [d.lineno for d in node.decorator_list])
+                kind = "class" if isinstance(node, ast.ClassDef) else "method" if prefix else "function"
+                symbols.append({"name": prefix + node.name, "kind": kind,
+                                "start": start, "end": node.end_lineno})
+                if kind == "class":
+                    visit(node.body, f"{prefix}{node.name}.")
+
+    visit(tree.body, "")
+    return symbols
+
+
+def outline_js(text):
+    lines = text.splitlines()
+    symbols, classes = [], []  # classes: (name, last line index)
+    for index, line in enumerate(lines):
+        while classes and index > classes[-1][1]:
+            classes.pop()
+        for kind, pattern in JS_DEFINITIONS:
+            match = pattern.match(line)
+            if match:
+                braced = "{" in line or (index + 1 < len(lines) and lines[index + 1].lstrip().startswith("{"))
+                end = block_end(lines, index) if braced else index
+                symbols.append({"name": match.group(1), "kind": kind, "start": index + 1, "end": end + 1})
+                if kind == "class":
+                    classes.append((match.group(1), end))
+                break
+        else:
+            match = JS_METHOD.match(line)
+            if classes and match and match.group(1) not in JS_KEYWORDS:
+                end = block_end(lines, index)
+                symbols.append({"name": f"{classes[-1][0]}.{match.group(1)}", "kind": "method",
+                                "start": index + 1, "end": end + 1})
+    return symbols
+
+
+def outline_css(text):
+    lines = text.splitlines()
+    symbols, index = [], 0
+    while index < len(lines):
+        line = lines[index].strip()
+        if "{" in line and not line.startswith(("/*", "*")):
+            selector = line.split("{", 1)[0].strip()
+            # Multi-line selector lists: pick up the lines that end with a comma
+            back = index - 1
+            while back >= 0 and lines[back].strip().endswith(","):
+                selector = f"{lines[back].strip()} {selector}"
+                back -= 1
+            end = block_end(lines, index)
+            kind = "at-rule" if selector.startswith("@") else "selector"
+            symbols.append({"name": " ".join(selector.split()) or "{", "kind": kind,
+                            "start": back + 2, "end": end + 1})
+            if kind == "selector":
+                index = end  # Nested rules only matter inside at-rules
+        index += 1
+    return symbols
+
+
+def outline_json(text):
+    """Top-level keys with the line range of each value."""
+    symbols, depth, quote_start, line_no, key = [], 0, None, 1, None
+    i = 0
+    while i < len(text):
+        char = text[i]
+        if char == "\n":
+            line_no += 1
+        elif quote_start is not None:
+            if char == "\\":
+                i += 1
+            elif char == '"':
+                if depth == 1:
+                    key = text[quote_start + 1:i]
+                quote_start = None
+        elif char == '"':
+            quote_start = i
+        elif char in "{[":
+            depth += 1
+        elif char in "}]":
+            depth -= 1
+            if depth == 0 and symbols:
+                line_start = text.rfind("\n", 0, i) + 1
+                symbols[-1]["end"] = max(symbols[-1]["start"], line_no - (not text[line_start:i].strip()))
+        elif char == ":" and depth == 1 and key is not None:
+            if symbols:
+                symbols[-1]["end"] = max(symbols[-1]["start"], line_no - 1)
+            symbols.append({"name": key, "kind": "key", "start": line_no, "end": line_no})
+        elif char == "," and depth == 1:
+            key = None
+        i += 1
+    return symbols
+
+
+def outline_html(text):
+    lines = text.splitlines()
+    symbols = []
+    for index, line in enumerate(lines):
+        for match in HTML_BLOCK.finditer(line):
+            tag = match.group(1).lower()
+            end = next((j for j in range(index, len(lines)) if f"</{tag}" in lines[j].lower()), index)
+            symbols.append({"name": f"<{tag}>", "kind": tag, "start": index + 1, "end": end + 1})
+        for match in HTML_ID.finditer(line):
+            symbols.append({"name": f"#{match.group(2)}", "kind": match.group(1).lower(),
+                            "start": index + 1, "end": index + 1})
+    return symbols
+
+
+def build_outline(ext, text):
+    if ext == ".py":
+        return outline_python(text)
+    if ext in JS_EXTS:
+        return outline_js(text)
+    if ext == ".css":
+        return outline_css(text)
+    if ext == ".json":
+        return outline_json(text)
+    if ext == ".html":
+        return outline_html(text)
+    return []
+
+
+def find_symbol(symbols, name):
+    """Symbols matching `name`: exact, then case-insensitive, then by last dotted part or prefix."""
+    for match in (lambda s: s["name"] == name,
+                  lambda s: s["name"].lower() == name.lower(),
+                  lambda s: s["name"].lower().rsplit(".", 1)[-1] == name.lower(),
+                  lambda s: s["name"].lower().startswith(name.lower())):
+        found = [s for s in symbols if match(s)]
+        if found:
+            return found
+    return []
+
+
+def format_outline(symbols, limit=OUTLINE_MAX_ENTRIES, max_chars=None):
+    """One row per symbol, stopping at `limit` rows or once `max_chars` would be exceeded."""
+    rows, used = [], 0
+    for s in symbols[:limit]:
+        name = s["name"] if len(s["name"]) <= OUTLINE_NAME_CHARS else s["name"][:OUTLINE_NAME_CHARS - 1] + "…"
+        row = f"  L{s['start']}-{s['end']}  {s['kind']} {name}"
+        if max_chars is not None and used + len(row) + 1 > max_chars - OUTLINE_MORE_CHARS:
+            break
+        rows.append(row)
+        used += len(row) + 1
+    if len(rows) < len(symbols):
+        rows.append(f"  … {len(symbols) - len(rows)} more")
+    return "\n".join(rows)
+
+
+class CodeOutlineCache:
+    """Symbol outlines of code files, built once per file content.
+
+    Outlines are stored as small JSON files keyed by the SHA-256 of the
+    file's bytes, so an unchanged file is never re-parsed and an edited
+    one gets a fresh outline.
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+
+    def load(self, path):
+        """Return (text, symbols) for a code file."""
+        path = Path(path)
+        data = path.read_bytes()
+        text = data.decode("utf-8")
+        key = hashlib.sha256(data).hexdigest()
+        cache_path = self.root / f"{key[:32]}.v{OUTLINE_VERSION}.json"
+        if cache_path.exists():
+            try:
+                with open(cache_path, "r", encoding="utf-8") as f:
+                    return text, json.load(f)
+            except (OSError, ValueError):
+                pass
+        symbols = build_outline(path.suffix.lower(), text)
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(cache_path, "w", encoding="utf-8") as f:
+            json.dump(symbols, f)
+        return text, symbols
@@ -0,0 +1,85 @@
+import os
+
+# --- CONFIGURATION ---
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", 3000))
+KEEP_RECENT_MESSAGES = 4      # Newest messages always sent verbatim (2 turns)
+COMPACT_CHARS = 400           # Older messages without a summary are cut to this
+
+
+def estimate_tokens(text):
+    """Rough token count (~4 chars per token for English/code) — no tokenizer needed."""
+    return len(text) // 4 + 1
+
+
+def compact_text(text, limit=COMPACT_CHARS):
+    if len(text) <= limit:
+        return text
+    return text[:limit].rstrip() + f" … [{len(text) - limit} chars trimmed]"
+
+
+class ConversationHistory:
+    """Conversation turns kept within a token budget.
+
+    The newest KEEP_RECENT_MESSAGES go out verbatim. Older messages are sent
+    in compact form — their stored summary (e.g. a file reference instead of
+    the file dump) or a trimmed excerpt — and the oldest are rolled into a
+    single note once even the compact forms no longer fit.
+    """
+
+    def __init__(self, token_budget=HISTORY_TOKEN_BUDGET, keep_recent=KEEP_RECENT_MESSAGES):
+        self.token_budget = token_budget
+        self.keep_recent = keep_recent
+        self.turns = []  # {"role", "content", "summary"}
+
+    def append(self, role, content, summary=None):
+        """Record a message; `summary` replaces bulky content once the turn ages out."""
+        self.turns.append({"role": role, "content": content, "summary": summary})
+
+    def clear(self):
+        self.turns = []
+
+    def __len__(self):
+        return len(self.turns)
+
+    def messages(self):
+        """Ollama-style messages for the next prompt, fitted to the token budget."""
+        split = max(0, len(self.turns) - self.keep_recent)
+        recent = [{"role": t["role"], "content": t["content"]} for t in self.turns[split:]]
+        older = [{"role": t["role"], "content": t["summary"] or compact_text(t["content"])}
+                 for t in self.turns[:split]]
+
+        # Even recent file dumps fall back to their summary if they blow the budget
+        used = sum(estimate_tokens(m["content"]) for m in recent)
+        for turn, message in zip(self.turns[split:], recent):
+            if used <= self.token_budget:
+                break
+            if turn["summary"]:
+                used -= estimate_tokens(message["content"]) - estimate_tokens(turn["summary"])
+                message["content"] = turn["summary"]
+
+        kept = []
+        for message in reversed(older):
+            cost = estimate_tokens(message["content"])
+            if used + cost > self.token_budget:
+                break
+            kept.insert(0, message)
+            used += cost
+
+        dropped = len(older) - len(kept)
+        if dropped:
+            note = f"[Earlier conversation: {dropped} older messages omitted to save context.]"
+            kept.insert(0, {"role": "system", "content": note})
+        return kept + recent
+
+    def transcript(self):
+        """Every message, untrimmed and unbudgeted, for a chat with a large context window.
+
+        Only file dumps older than the newest KEEP_RECENT_MESSAGES are swapped for
+        their summary; ordinary answers keep their full text however old they are.
+        """
+        split = max(0, len(self.turns) - self.keep_recent)
+        return [{"role": t["role"], "content": t["summary"] if t["summary"] and i < split else t["content"]}
+                for i, t in enumerate(self.turns)]
+
+    def token_estimate(self):
+        return sum(estimate_tokens(m["content"]) for m in self.messages())
@@ -1,15 +1,60 @@
+import argparse
+import hashlib
+import json
 import os
+import queue
+import re
 import shutil
+import subprocess
+import sys
+import threading
 import time
 import zipfile
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait
 from pathlib import Path
 
+from search_index import SearchIndex
+
 # --- CONFIGURATION ---
 BASE_DIR = Path(__file__).parent.parent
 INBOX_DIR = BASE_DIR / "00_inbox"
 WORK_DIR = BASE_DIR / "01_active_lab"
 CONTEXT_DIR = WORK_DIR / "00_readings_and_context"
 IMAGES_DIR = CONTEXT_DIR / "images"
+MANIFEST_PATH = WORK_DIR / ".ingest_manifest.json"
+SEARCH_INDEX_PATH = WORK_DIR / ".cache" / "search_index.json"
+
+# --- PARALLEL CONFIGURATION ---
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", min(4, os.cpu_count() or 1)))  # Each worker holds a PyMuPDF document
+PDF_SPLIT_PAGES = 100  # PDFs longer than this are extracted in page ranges
+
+# --- IMAGE EXTRACTION ---
+MIN_IMAGE_BYTES = int(os.getenv("INGEST_MIN_IMAGE_BYTES", 2048))  # Skip icons, bullets, spacers
+PASSTHROUGH_IMAGE_EXTS = {'png', 'jpeg', 'jpg'}  # Written as-is, no re-encode
+
+# --- ARCHIVES (zip-bomb guards apply to the whole archive, nested ones included) ---
+STAGING_DIR = WORK_DIR / ".staging"  # Members waiting for their handler
+ARCHIVE_MAX_BYTES = int(os.getenv("INGEST_ARCHIVE_MAX_MB", 4096)) * 1024 * 1024
+ARCHIVE_MAX_MEMBERS = 10000
+ARCHIVE_MAX_RATIO = 100            # Uncompressed/compressed size of a single member
+ARCHIVE_RATIO_MIN_BYTES = 1024 * 1024  # Small members may compress well without being bombs
+ARCHIVE_MAX_DEPTH = 3              # Archives inside archives
+ARCHIVE_JUNK = {'.ds_store', 'thumbs.db', 'desktop.ini'}
+
+# --- OCR FALLBACK (scanned pages → local vision model) ---
+OCR_ENABLED = os.getenv("INGEST_OCR", "1") == "1"
+OCR_DIR = CONTEXT_DIR / ".ocr"  # Rendered pages + per-page OCR text, one folder per document
+OCR_DPI = int(os.getenv("OCR_DPI", 150))
+OCR_MODEL = os.getenv("OCR_MODEL", "moondream")
+OCR_BATCH_PAGES = 10   # Pages recognized between markdown merges
+OCR_LOCK_STALE = 600   # Seconds without progress before a lock is considered abandoned
+OCR_PROMPT = "Transcribe all text on this scanned page exactly as written. Output plain text only."
+
+# --- WATCH MODE ---
+WATCH_SETTLE = float(os.getenv("INGEST_WATCH_SETTLE", 3.0))  # Seconds an item must stop changing
+WATCH_POLL_INTERVAL = 2.0  # Inbox rescans when filesystem events are unavailable
+WATCH_TICK = 0.5
+WATCH_IGNORE_SUFFIXES = {'.part', '.crdownload', '.download', '.tmp'}  # Downloads still in flight
 
 # Try importing tools, fail gracefully if missing
 try:
@@ -19,6 +64,25 @@ except ImportError:
     print("⚠️ PyMuPDF missing. Run: py -m pip install PyMuPDF")
     PYMUPDF_AVAILABLE = False
 
+try:
+    import ollama
+    OLLAMA_AVAILABLE = True
+except ImportError:
+    OLLAMA_AVAILABLE = False
+
+try:
+    import rarfile
+    RARFILE_AVAILABLE = True
+except ImportError:
+    RARFILE_AVAILABLE = False
+
+try:
+    from watchdog.events import FileSystemEventHandler
+    from watchdog.observers import Observer
+    WATCHDOG_AVAILABLE = True
+except ImportError:
+    WATCHDOG_AVAILABLE = False
+
 try:
     from youtube_transcript_api import YouTubeTranscriptApi
     YT_AVAILABLE = True
@@ -44,24 +108,433 @@ def print_tree(directory, prefix=""):
             print(f"{prefix}📄 {item.name} ({size_kb:.0f} KB)")
 
 
+# ── Manifest (incremental ingest) ────────────────────────────────
+
+HASH_CHUNK = 1024 * 1024
+
+
+def load_manifest():
+    if MANIFEST_PATH.exists():
+        try:
+            with open(MANIFEST_PATH, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            print("⚠️ Manifest unreadable — treating all items as new.")
+    return {}
+
+
+def save_manifest(manifest):
+    tmp_path = MANIFEST_PATH.with_suffix(".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    tmp_path.replace(MANIFEST_PATH)
+
+
+def hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def hash_item(item):
+    """Content hash of a file, or of every file (path + bytes) inside a folder."""
+    if not item.is_dir():
+        return hash_file(item)
+    digest = hashlib.sha256()
+    for path in sorted(item.rglob("*")):
+        if path.is_file():
+            digest.update(path.relative_to(item).as_posix().encode("utf-8"))
+            digest.update(hash_file(path).encode("ascii"))
+    return digest.hexdigest()
+
+
+def item_signature(item):
+    """Cheap (size, mtime) signature — stats only, no file contents read."""
+    if not item.is_dir():
+        st = item.stat()
+        return st.st_size, st.st_mtime
+    size, mtime = 0, 0.0
+    for path in item.rglob("*"):
+        if path.is_file():
+            st = path.stat()
+            size += st.st_size
+            mtime = max(mtime, st.st_mtime)
+    return size, mtime
+
+
+def classify_item(item, manifest):
+    """Return (status, record): status is 'new', 'changed' or 'unchanged'."""
+    size, mtime = item_signature(item)
+    entry = manifest.get(item.name)
+    if entry and entry["size"] == size and entry["mtime"] == mtime:
+        return "unchanged", entry
+
+    record = {"hash": hash_item(item), "size": size, "mtime": mtime}
+    if entry is None:
+        return "new", record
+    return ("unchanged" if entry["hash"] == record["hash"] else "changed"), record
+
+
+def item_outputs(item):
+    """Paths (relative to WORK_DIR) an ingested item produced, recorded in its manifest entry."""
+    handler = file_handler(item.name)
+    if (WORK_DIR / item.name).is_dir():
+        paths = [WORK_DIR / item.name]  # Migrated folder
+    elif handler is extract_zip:
+        paths = [WORK_DIR / item.stem, *CONTEXT_DIR.glob(f"{item.stem}__*"), *IMAGES_DIR.glob(f"{item.stem}__*")]
+    elif handler is extract_pdf:
+        paths = [CONTEXT_DIR / f"{item.stem}.md"]
+    elif handler is move_image:
+        paths = [IMAGES_DIR / item.name]
+    else:
+        paths = [CONTEXT_DIR / item.name]
+    return sorted(path.relative_to(WORK_DIR).as_posix() for path in paths if path.exists())
+
+
+def outputs_present(entry):
+    """True if every output recorded for a manifest entry is still on disk."""
+    outputs = entry.get("outputs")
+    return outputs is not None and all((WORK_DIR / path).exists() for path in outputs)
+
+
+def same_file(src, dest):
+    """True if dest already holds exactly the bytes of src."""
+    if not dest.is_file() or src.stat().st_size != dest.stat().st_size:
+        return False
+    return hash_file(src) == hash_file(dest)
+
+
+def discard_item(item):
+    """Remove an already-ingested item from the inbox."""
+    if item.is_dir():
+        shutil.rmtree(item)
+    else:
+        item.unlink()
+
+
 # ── File Handlers ────────────────────────────────────────────────
 
-def extract_zip(item):
-    """Extract zip/rar archives into the work directory."""
+class ArchiveLimitError(Exception):
+    """An archive tripped one of the zip-bomb guards."""
+
+
+def open_archive(path):
+    if path.suffix.lower() == '.rar':
+        return rarfile.RarFile(str(path))
+    return zipfile.ZipFile(path)
+
+
+def is_junk_member(name):
+    parts = name.split("/")
+    return "__MACOSX" in parts or parts[-1].startswith("._") or parts[-1].lower() in ARCHIVE_JUNK
+
+
+def safe_member_path(name):
+    """Member name as a relative Path, or None if it would escape the target folder."""
+    parts = [p for p in name.replace("\\", "/").split("/") if p not in ("", ".")]
+    if not parts or ".." in parts or ":" in parts[0]:
+        return None
+    return Path(*parts)
+
+
+def check_member(info):
+    packed, size = info.compress_size, info.file_size
+    if size > ARCHIVE_RATIO_MIN_BYTES and packed and size / packed > ARCHIVE_MAX_RATIO:
+        raise ArchiveLimitError(f"{info.filename} expands {size / packed:.0f}x")
+
+
+def copy_member(archive, info, dest, budget):
+    """Stream one member to dest, counting the real bytes against the budget."""
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest.with_name(dest.name + ".tmp")
+    try:
+        with archive.open(info) as src, open(tmp_path, "wb") as dst:
+            for chunk in iter(lambda: src.read(HASH_CHUNK), b""):
+                budget["bytes"] += len(chunk)
+                if budget["bytes"] > ARCHIVE_MAX_BYTES:
+                    raise ArchiveLimitError(f"more than {ARCHIVE_MAX_BYTES // 2**20} MB uncompressed")
+                dst.write(chunk)
+        tmp_path.replace(dest)
+    finally:
+        tmp_path.unlink(missing_ok=True)
+
+
+def member_name(prefix, rel):
+    """Flat, collision-free name for a member that lands in a shared folder: <archive>__week1__lecture.pdf."""
+    return "__".join([prefix, *rel.parts])
+
+
+def unpack_archive(path, target, staging, budget, pool, futures, ocr=OCR_ENABLED, prefix=None, depth=0):
+    """Dispatch each member of one archive; recurses into nested archives.
+
+    Returns False if any member handled here (not in the pool) failed.
+    """
+    prefix = prefix or path.stem
+    ok = True
+    with open_archive(path) as archive:
+        members = [info for info in archive.infolist()
+                   if not info.is_dir() and not is_junk_member(info.filename)]
+        budget["members"] += len(members)
+        if budget["members"] > ARCHIVE_MAX_MEMBERS:
+            raise ArchiveLimitError(f"more than {ARCHIVE_MAX_MEMBERS} members")
+        if budget["bytes"] + sum(info.file_size for info in members) > ARCHIVE_MAX_BYTES:
+            raise ArchiveLimitError(f"more than {ARCHIVE_MAX_BYTES // 2**20} MB uncompressed")
+
+        for info in members:
+            rel = safe_member_path(info.filename)
+            if rel is None:
+                print(f"    ⚠️ Unsafe path skipped: {info.filename}")
+                continue
+            check_member(info)
+
+            handler = file_handler(rel.name)
+            if handler is None:
+                copy_member(archive, info, target / rel, budget)  # Code, data, … keep their layout
+                continue
+
+            staged = staging / rel if handler is extract_zip else staging / member_name(prefix, rel)
+            copy_member(archive, info, staged, budget)
+            if handler is extract_zip:
+                if rel.suffix.lower() == '.rar' and not RARFILE_AVAILABLE:
+                    print(f"    ⚠️ Nested RAR kept as-is (rarfile not installed): {rel}")
+                    shutil.move(str(staged), str(target / rel))
+                    continue
+                if depth + 1 > ARCHIVE_MAX_DEPTH:
+                    raise ArchiveLimitError(f"archives nested more than {ARCHIVE_MAX_DEPTH} deep")
+                print(f"  📦 Nested archive: {rel}")
+                nested = rel.parent / rel.stem
+                ok = unpack_archive(staged, target / nested, staging / f"{nested}.d", budget, pool, futures,
+                                    ocr, member_name(prefix, nested), depth + 1) and ok
+                staged.unlink()
+            elif handler is extract_pdf and pool is not None:
+                futures[pool.submit(extract_pdf, staged, ocr)] = staged
+            else:
+                ok = run_handler(handler, staged, ocr) and ok
+    return ok
+
+
+def extract_zip(item, pool=None, ocr=OCR_ENABLED):
+    """Stream zip/rar members through the same handlers as inbox items.
+
+    Members are copied out one at a time: PDFs, images, text and nested
+    archives go through file_handler(), everything else lands in
+    WORK_DIR/<archive name>/ with its folder layout intact. Handled members
+    are named after the archive and their folder (<archive>__week1__lecture.md),
+    so same-named files in different folders don't overwrite each other.
+    Given a process pool, member PDFs are extracted in parallel. If any member
+    fails the archive stays in the inbox, so the next run retries it.
+    """
+    if item.suffix.lower() == '.rar' and not RARFILE_AVAILABLE:
+        print(f"  ⚠️ Skipping RAR (rarfile not installed): {item.name}. Run: py -m pip install rarfile")
+        return False
+
     print(f"  📦 Extracting: {item.name}")
-    target_folder = WORK_DIR / item.stem
-    target_folder.mkdir(exist_ok=True)
+    staging = STAGING_DIR / item.stem
+    budget = {"bytes": 0, "members": 0}
+    futures = {}
+    ok = True
     try:
-        with zipfile.ZipFile(item, 'r') as zip_ref:
-            zip_ref.extractall(target_folder)
-        item.unlink()
-        return True
+        ok = unpack_archive(item, WORK_DIR / item.stem, staging, budget, pool, futures, ocr)
+    except ArchiveLimitError as e:
+        print(f"  ❌ Archive refused ({item.name}): {e}")
+        ok = False
     except Exception as e:
         print(f"  ❌ Zip Error: {e}")
-        return False
+        ok = False
+
+    for future in as_completed(futures):
+        try:
+            ok = future.result() and ok
+        except Exception as e:
+            print(f"  ❌ Worker Error ({futures[future].name}): {e}")
+            ok = False
+    shutil.rmtree(staging, ignore_errors=True)
+    try:
+        STAGING_DIR.rmdir()  # Only succeeds once no other archive is mid-flight
+    except OSError:
+        pass
+
+    if ok:
+        item.unlink()
+    else:
+        print(f"  ⚠️ Kept in inbox for the next run: {item.name}")
+    return ok
+
+
+PAGE_SEPARATOR = "\n\n---\n\n"
+CHECKPOINT_PAGES = 25  # Pages between resume checkpoints
+
+
+def partial_path(item, start=None):
+    """Where a PDF's markdown is streamed before it is complete."""
+    if start is None:
+        return CONTEXT_DIR / f"{item.stem}.md.partial"
+    return CONTEXT_DIR / f"{item.stem}.md.p{start:05d}.partial"
+
+
+def progress_path(out_path):
+    return out_path.with_name(out_path.name + ".json")
+
+
+def load_progress(out_path, source_hash, start, end):
+    """Resume point for an interrupted stream, or None to start over."""
+    marker = progress_path(out_path)
+    if not (marker.exists() and out_path.exists()):
+        return None
+    try:
+        with open(marker, "r", encoding="utf-8") as f:
+            progress = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if (progress.get("source"), progress.get("start"), progress.get("end")) != (source_hash, start, end):
+        return None
+    return progress
+
+
+def save_progress(out_path, progress):
+    with open(progress_path(out_path), "w", encoding="utf-8") as f:
+        json.dump(progress, f)
+
+
+def clear_partial(out_path):
+    for path in (out_path, progress_path(out_path)):
+        if path.exists():
+            path.unlink()
+
+
+def save_pdf_image(doc, xref):
+    """Write one embedded image to IMAGES_DIR, named by content hash.
+
+    The original stream is passed through when it is already a PNG/JPEG with
+    no soft mask or CMYK data; anything else is decoded and re-encoded as PNG.
+    Returns (file_name, is_new), or (None, False) for images under
+    MIN_IMAGE_BYTES. Identical images across pages and documents share a file.
+    """
+    info = doc.extract_image(xref)
+    raw = info["image"]
+    if len(raw) < MIN_IMAGE_BYTES:
+        return None, False
+
+    passthrough = (info["ext"] in PASSTHROUGH_IMAGE_EXTS
+                   and not info.get("smask") and info.get("colorspace", 3) <= 3)
+    ext = info["ext"] if passthrough else "png"
+    img_name = f"img_{hashlib.sha256(raw).hexdigest()[:16]}.{ext}"
+    img_path = IMAGES_DIR / img_name
+    if img_path.exists():
+        return img_name, False
+
+    # Write to a temp name first — another worker may be saving the same image
+    tmp_path = img_path.with_name(f"{img_name}.{os.getpid()}.tmp")
+    if passthrough:
+        tmp_path.write_bytes(raw)
+    else:
+        pix = fitz.Pixmap(doc, xref)
+        if pix.n - pix.alpha > 3:  # CMYK → RGB
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        pix.save(str(tmp_path), output="png")
+    tmp_path.replace(img_path)
+    return img_name, True
+
 
+def stream_pdf_pages(item, out_path, start=0, end=None, header="", ocr=OCR_ENABLED, source_hash=None):
+    """Stream pages [start, end) to out_path as markdown sections, one page at a time.
 
-def extract_pdf(item):
+    Progress is checkpointed next to out_path, so an interrupted run picks up
+    at the last checkpoint instead of page 1. Safe to run in a worker process.
+    Returns the progress dict (sections, text_pages, images, reused_images,
+    scanned_pages). Pass source_hash when the caller already has it, so
+    page-range workers don't each re-read the whole PDF.
+    """
+    doc = fitz.open(str(item))
+    end = doc.page_count if end is None else min(end, doc.page_count)
+    source_hash = source_hash or hash_file(item)
+
+    progress = load_progress(out_path, source_hash, start, end)
+    if progress:
+        with open(out_path, "r+b") as f:
+            f.truncate(progress["offset"])  # Drop anything after the checkpoint
+        out = open(out_path, "ab")
+        print(f"    ↩️ Resuming {item.name} at page {progress['next_page'] + 1}")
+    else:
+        progress = {"source": source_hash, "start": start, "end": end,
+                    "next_page": start, "offset": 0, "sections": 0, "text_pages": 0,
+                    "images": 0, "reused_images": 0, "scanned_pages": []}
+        out = open(out_path, "wb")
+        out.write(header.encode("utf-8"))
+
+    saved_xrefs = {}  # xref → image file name (None if skipped)
+
+    try:
+        for page_num in range(progress["next_page"], end):
+            page = doc[page_num]
+
+            # Extract embedded images (once per xref, shared by content hash)
+            image_refs = []
+            for img in page.get_images(full=True):
+                xref = img[0]
+                if xref not in saved_xrefs:
+                    try:
+                        img_name, is_new = save_pdf_image(doc, xref)
+                    except Exception:
+                        img_name, is_new = None, False  # Skip problematic images
+                    saved_xrefs[xref] = img_name
+                    if img_name:
+                        progress["images" if is_new else "reused_images"] += 1
+                img_name = saved_xrefs[xref]
+                if img_name and img_name not in image_refs:
+                    image_refs.append(img_name)
+
+            # Extract text
+            text = page.get_text()
+            if text.strip() or image_refs:
+                section = f"## Page {page_num + 1}\n\n{text}"
+                if image_refs:
+                    section += "\n" + "\n".join(f"![](images/{name})" for name in image_refs) + "\n"
+                if progress["sections"]:
+                    section = PAGE_SEPARATOR + section
+                out.write(section.encode("utf-8"))
+                progress["sections"] += 1
+                if text.strip():
+                    progress["text_pages"] += 1
+
+            # No text layer but page images → render it for the OCR job
+            if ocr and not text.strip() and page.get_images():
+                render_ocr_page(item, page)
+                progress["scanned_pages"].append(page_num + 1)
+
+            progress["next_page"] = page_num + 1
+            if progress["next_page"] % CHECKPOINT_PAGES == 0:
+                out.flush()
+                progress["offset"] = out.tell()
+                save_progress(out_path, progress)
+    finally:
+        out.close()
+        doc.close()
+
+    progress["offset"] = out_path.stat().st_size
+    save_progress(out_path, progress)
+    return progress
+
+
+def finish_markdown(item, partial, sections):
+    """Promote a completed partial file to CONTEXT_DIR/<stem>.md."""
+    if sections:
+        partial.replace(CONTEXT_DIR / (item.stem + ".md"))
+    clear_partial(partial)
+
+
+def report_pdf(totals, start):
+    elapsed = time.time() - start
+    text_status = f"{totals['text_pages']} pages" if totals["text_pages"] else "⚠️ scanned (no text)"
+    reused = f" (+{totals['reused_images']} reused)" if totals["reused_images"] else ""
+    print(f"    ✅ {text_status}, {totals['images']} images{reused} ({elapsed:.1f}s)")
+    if totals["scanned_pages"]:
+        print(f"    🔍 {len(totals['scanned_pages'])} scanned pages queued for OCR")
+
+
+def extract_pdf(item, ocr=OCR_ENABLED):
     """Extract text + images from PDF using PyMuPDF. Zero AI needed."""
     if not PYMUPDF_AVAILABLE:
         print(f"  ⚠️ Skipping PDF (PyMuPDF not installed): {item.name}")
@@ -72,65 +545,118 @@ def extract_pdf(item):
     start = time.time()
 
     try:
-        doc = fitz.open(str(item))
-        pages_text = []
-        img_count = 0
+        digest = hash_file(item)
+        if ocr:  # A plain re-ingest leaves a pending OCR job alone
+            reset_ocr_job(item, digest)
+        partial = partial_path(item)
+        totals = stream_pdf_pages(item, partial, header=f"# {item.stem}\n\n", ocr=ocr, source_hash=digest)
+        finish_markdown(item, partial, totals["sections"])
+        if ocr:
+            queue_ocr_job(item, totals["scanned_pages"])
+        report_pdf(totals, start)
+        item.unlink()
+        return True
 
-        for page_num, page in enumerate(doc):
-            # Extract text
-            text = page.get_text()
-            if text.strip():
-                pages_text.append(f"## Page {page_num + 1}\n\n{text}")
+    except Exception as e:
+        print(f"  ❌ PDF Error: {e}")
+        clear_partial(partial_path(item))  # Nothing will resume from it once the PDF is moved
+        shutil.move(str(item), str(CONTEXT_DIR / item.name))
+        return False
 
-            # Extract embedded images
-            for img_idx, img in enumerate(page.get_images(full=True)):
-                xref = img[0]
-                try:
-                    pix = fitz.Pixmap(doc, xref)
-                    if pix.n > 4:  # CMYK → RGB
-                        pix = fitz.Pixmap(fitz.csRGB, pix)
-                    img_name = f"{item.stem}_p{page_num + 1}_img{img_idx + 1}.png"
-                    pix.save(str(IMAGES_DIR / img_name))
-                    img_count += 1
-                except Exception:
-                    pass  # Skip problematic images
 
-        doc.close()
+def pdf_page_count(item):
+    with fitz.open(str(item)) as doc:
+        return doc.page_count
+
 
-        # Save extracted text as markdown
-        if pages_text:
-            md_content = f"# {item.stem}\n\n" + "\n\n---\n\n".join(pages_text)
-            md_path = CONTEXT_DIR / (item.stem + ".md")
-            with open(md_path, "w", encoding="utf-8") as f:
-                f.write(md_content)
+def pdf_page_ranges(item, chunk=PDF_SPLIT_PAGES):
+    """Split a PDF into [start, end) page ranges of at most `chunk` pages."""
+    count = pdf_page_count(item)
+    return [(s, min(s + chunk, count)) for s in range(0, count, chunk)]
 
-        elapsed = time.time() - start
-        text_status = f"{len(pages_text)} pages" if pages_text else "⚠️ scanned (no text)"
-        print(f"    ✅ {text_status}, {img_count} images ({elapsed:.1f}s)")
 
+def finish_split_pdf(item, ranges, range_futures, start, ocr=OCR_ENABLED):
+    """Stitch page-range part files back into one markdown file, in page order."""
+    try:
+        totals = {"sections": 0, "text_pages": 0, "images": 0, "reused_images": 0, "scanned_pages": []}
+        partial = partial_path(item)
+        with open(partial, "wb") as out:
+            out.write(f"# {item.stem}\n\n".encode("utf-8"))
+            for (range_start, _), future in zip(ranges, range_futures):
+                part = future.result()
+                if part["sections"]:
+                    if totals["sections"]:
+                        out.write(PAGE_SEPARATOR.encode("utf-8"))
+                    with open(partial_path(item, range_start), "rb") as f:
+                        shutil.copyfileobj(f, out)
+                for key in totals:
+                    totals[key] += part[key]
+
+        finish_markdown(item, partial, totals["sections"])
+        if ocr:
+            queue_ocr_job(item, totals["scanned_pages"])
+        for range_start, _ in ranges:
+            clear_partial(partial_path(item, range_start))
+        print(f"  📄 Stitched PDF: {item.name}")
+        report_pdf(totals, start)
         item.unlink()
         return True
-
     except Exception as e:
-        print(f"  ❌ PDF Error: {e}")
+        print(f"  ❌ PDF Error ({item.name}): {e}")
+        wait(range_futures)  # Let the other ranges finish writing before their files go
+        clear_partial(partial_path(item))
+        for range_start, _ in ranges:
+            clear_partial(partial_path(item, range_start))
         shutil.move(str(item), str(CONTEXT_DIR / item.name))
         return False
 
 
 def move_folder(item):
-    """Move folder into work directory."""
+    """Move folder into work directory, replacing it: changed files are copied, removed ones deleted.
+
+    Unchanged files are left alone, and so are hidden folders such as the
+    .vision/ derivatives the tutor keeps next to images.
+    """
     print(f"  📂 Migrating: {item.name}")
     dest_path = WORK_DIR / item.name
-    if dest_path.exists():
-        shutil.rmtree(dest_path)
-    shutil.move(str(item), str(dest_path))
+    if not dest_path.exists():
+        shutil.move(str(item), str(dest_path))
+        return True
+
+    updated, removed = 0, 0
+    sources = set()
+    for src in item.rglob("*"):
+        if not src.is_file():
+            continue
+        rel = src.relative_to(item)
+        sources.add(rel)
+        dest = dest_path / rel
+        if same_file(src, dest):
+            continue
+        dest.parent.mkdir(parents=True, exist_ok=True)
+        shutil.copy2(str(src), str(dest))
+        updated += 1
+
+    for dest in sorted(dest_path.rglob("*"), reverse=True):  # Children before their folders
+        rel = dest.relative_to(dest_path)
+        if any(part.startswith(".") for part in rel.parts):
+            continue
+        if dest.is_file() and rel not in sources:
+            dest.unlink()
+            removed += 1
+        elif dest.is_dir() and not any(dest.iterdir()):
+            dest.rmdir()
+    shutil.rmtree(item)
+    print(f"    ✅ {updated} files updated, {removed} removed")
     return True
 
 
 def move_image(item):
     """Copy image files to context/images folder."""
     print(f"  🖼️ Image: {item.name}")
-    shutil.copy2(str(item), str(IMAGES_DIR / item.name))
+    dest = IMAGES_DIR / item.name
+    if not same_file(item, dest):
+        shutil.copy2(str(item), str(dest))
     item.unlink()
     return True
 
@@ -142,48 +668,508 @@ def move_text(item):
     return True
 
 
+# ── OCR Fallback ─────────────────────────────────────────────────
+
+def ocr_job_dir(stem):
+    return OCR_DIR / stem
+
+
+def render_ocr_page(item, page):
+    """Render one scanned page to PNG at OCR_DPI (skipped if already rendered)."""
+    job_dir = ocr_job_dir(item.stem)
+    png_path = job_dir / f"p{page.number + 1:05d}.png"
+    if not png_path.exists():
+        job_dir.mkdir(parents=True, exist_ok=True)
+        page.get_pixmap(dpi=OCR_DPI).save(str(png_path))
+
+
+def reset_ocr_job(item, digest):
+    """Start this PDF's OCR folder fresh unless it belongs to the same bytes (resume)."""
+    job_dir = ocr_job_dir(item.stem)
+    marker = job_dir / "source"
+    if marker.exists() and marker.read_text(encoding="utf-8") == digest:
+        return
+    if job_dir.exists():
+        shutil.rmtree(job_dir)
+    job_dir.mkdir(parents=True)
+    marker.write_text(digest, encoding="utf-8")
+
+
+def queue_ocr_job(item, scanned_pages):
+    job_dir = ocr_job_dir(item.stem)
+    if not scanned_pages:
+        if job_dir.exists():
+            shutil.rmtree(job_dir)
+        return
+    job = {"stem": item.stem, "pages": sorted(scanned_pages), "model": OCR_MODEL, "queued": time.time()}
+    with open(job_dir / "job.json", "w", encoding="utf-8") as f:
+        json.dump(job, f, indent=2)
+
+
+def pending_ocr_jobs():
+    return sorted(OCR_DIR.glob("*/job.json")) if OCR_DIR.exists() else []
+
+
+def acquire_ocr_lock():
+    """One OCR worker at a time; a lock untouched for OCR_LOCK_STALE seconds is reclaimed."""
+    lock = OCR_DIR / "ocr.lock"
+    OCR_DIR.mkdir(parents=True, exist_ok=True)
+    try:
+        if time.time() - lock.stat().st_mtime >= OCR_LOCK_STALE:
+            lock.unlink(missing_ok=True)
+    except FileNotFoundError:
+        pass
+    try:
+        fd = os.open(lock, os.O_CREAT | os.O_EXCL | os.O_WRONLY)  # Atomic: only one process creates it
+    except FileExistsError:
+        return None
+    with os.fdopen(fd, "w", encoding="utf-8") as f:
+        f.write(str(os.getpid()))
+    return lock
+
+
+def merge_ocr_text(job):
+    """Write recognized page text into CONTEXT_DIR/<stem>.md, in page order."""
+    stem, job_dir = job["stem"], ocr_job_dir(job["stem"])
+    md_path = CONTEXT_DIR / f"{stem}.md"
+    header = f"# {stem}\n\n"
+    sections = {}
+    if md_path.exists():
+        body = md_path.read_text(encoding="utf-8")
+        body = body[len(header):] if body.startswith(header) else body
+        page = 0  # Anything before the first page heading is kept as-is
+        for fragment in body.split(PAGE_SEPARATOR):
+            match = re.match(r"## Page (\d+)\n", fragment)
+            if match:
+                page = int(match.group(1))
+                sections[page] = fragment
+            else:
+                # Page text can contain the separator itself — keep the tail with its page
+                sections[page] = f"{sections[page]}{PAGE_SEPARATOR}{fragment}" if page in sections else fragment
+
+    for page in job["pages"]:
+        txt_path = job_dir / f"p{page:05d}.txt"
+        if not txt_path.exists():
+            continue
+        image_refs = re.findall(r"^!\[\]\(images/.+\)$", sections.get(page, ""), re.MULTILINE)
+        section = (f"## Page {page}\n\n<a id=\"page-{page}\"></a>\n*(OCR · {job['model']})*\n\n"
+                   f"{txt_path.read_text(encoding='utf-8').strip()}\n")
+        if image_refs:
+            section += "\n" + "\n".join(image_refs) + "\n"
+        sections[page] = section
+
+    tmp_path = md_path.with_name(md_path.name + ".tmp")
+    with open(tmp_path, "w", encoding="utf-8") as f:
+        f.write(header + PAGE_SEPARATOR.join(sections[n] for n in sorted(sections)))
+    tmp_path.replace(md_path)
+
+
+def run_ocr_jobs():
+    """Recognize queued scanned pages with the local vision model. Resumable per page."""
+    if not OLLAMA_AVAILABLE:
+        print("⚠️ OCR needs the ollama package. Run: py -m pip install ollama")
+        return
+    lock = acquire_ocr_lock()
+    if lock is None:
+        print("⏳ Another OCR job is already running.")
+        return
+
+    client = ollama.Client(host='http://localhost:11434')
+    try:
+        while jobs := pending_ocr_jobs():  # Also picks up jobs queued while this one ran
+            for job_path in jobs:
+                with open(job_path, "r", encoding="utf-8") as f:
+                    job = json.load(f)
+                job_dir = job_path.parent
+                pending = [p for p in job["pages"] if not (job_dir / f"p{p:05d}.txt").exists()]
+                print(f"🔍 OCR {job['stem']}: {len(pending)} of {len(job['pages'])} pages left ({job['model']})")
+
+                for batch_start in range(0, len(pending), OCR_BATCH_PAGES):
+                    start = time.time()
+                    batch = pending[batch_start:batch_start + OCR_BATCH_PAGES]
+                    for page in batch:
+                        png_path = job_dir / f"p{page:05d}.png"
+                        text = ""
+                        if png_path.exists():
+                            response = client.chat(model=job["model"], messages=[{
+                                'role': 'user', 'content': OCR_PROMPT, 'images': [str(png_path)],
+                            }])
+                            text = response['message']['content']
+                        (job_dir / f"p{page:05d}.txt").write_text(text, encoding="utf-8")
+                        lock.touch()
+                    merge_ocr_text(job)
+                    print(f"    ✅ pages {batch[0]}-{batch[-1]} ({time.time() - start:.1f}s)")
+
+                merge_ocr_text(job)
+                shutil.rmtree(job_dir)
+                print(f"  ✅ OCR complete: {job['stem']}.md")
+        update_search_index()
+    finally:
+        lock.unlink(missing_ok=True)
+
+
+def start_ocr_background():
+    """Run the OCR queue in a detached process so ingest returns immediately."""
+    log_path = OCR_DIR / "ocr.log"
+    with open(log_path, "a", encoding="utf-8") as log:
+        subprocess.Popen([sys.executable, str(Path(__file__).resolve()), "--ocr"],
+                         stdout=log, stderr=subprocess.STDOUT, start_new_session=True)
+    print(f"🔍 OCR running in background → {log_path}")
+
+
 # ── Main Pipeline ────────────────────────────────────────────────
 
 IMAGE_EXTS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.svg'}
 TEXT_EXTS = {'.md', '.txt'}
 ARCHIVE_EXTS = {'.zip', '.rar'}
 
-def ingest_materials():
-    print("🚀 Study Buddy Ingest Pipeline (v6.0 — Smart Processing)")
-    print("─" * 50)
+def file_handler(name):
+    """Pick the handler for a file by its extension, or None if it should be skipped."""
+    ext = Path(name).suffix.lower()
+    if ext in ARCHIVE_EXTS:
+        return extract_zip
+    if ext == '.pdf':
+        return extract_pdf
+    if ext in IMAGE_EXTS:
+        return move_image
+    if ext in TEXT_EXTS:
+        return move_text
+    return None
 
-    items = [i for i in INBOX_DIR.iterdir()
-             if not i.name.startswith(".") and "__MACOSX" not in i.name]
 
-    if not items:
-        print("⚠️ Inbox empty. Drop materials into /00_inbox")
-        return
+def run_handler(handler, item, ocr=OCR_ENABLED):
+    """Call a handler; PDF extraction, direct or inside an archive, honours the ocr flag."""
+    if handler is extract_pdf or handler is extract_zip:
+        return handler(item, ocr=ocr)
+    return handler(item)
 
-    stats = {"processed": 0, "skipped": 0}
-    start_time = time.time()
 
+def get_handler(item):
+    """Pick the handler for an inbox item, or None if it should be skipped."""
+    if item.is_dir():
+        return move_folder
+    return file_handler(item.name)
+
+
+def plan_items(items, manifest, stats, force=False):
+    """Classify items against the manifest; drop unchanged ones from the work list.
+
+    An unchanged item is still processed when forced, or when one of its
+    recorded outputs is gone (context/ cleared, a file deleted).
+    """
+    labels = {"new": "🆕 new", "changed": "♻️ changed", "unchanged": "✔️ unchanged"}
+    todo, records = [], {}
     for item in items:
-        if item.is_dir():
-            if move_folder(item): stats["processed"] += 1
-        elif item.suffix.lower() in ARCHIVE_EXTS:
-            if extract_zip(item): stats["processed"] += 1
-        elif item.suffix.lower() == '.pdf':
-            if extract_pdf(item): stats["processed"] += 1
-        elif item.suffix.lower() in IMAGE_EXTS:
-            if move_image(item): stats["processed"] += 1
-        elif item.suffix.lower() in TEXT_EXTS:
-            if move_text(item): stats["processed"] += 1
+        if get_handler(item) is None:
+            todo.append(item)  # Reported as skipped by the pipeline
+            continue
+        status, record = classify_item(item, manifest)
+        entry = manifest.get(item.name, {})
+        forced = force and status == "unchanged"
+        missing = status == "unchanged" and not forced and not outputs_present(entry)
+        note = " (forced)" if forced else " (outputs missing)" if missing else ""
+        print(f"  {labels[status]}{note}: {item.name}")
+        stats[status] += 1
+        if status == "unchanged" and not forced and not missing:
+            manifest[item.name] = {**record, "outputs": entry["outputs"]}
+            discard_item(item)
         else:
+            todo.append(item)
+            records[item.name] = record
+    return todo, records
+
+
+def mark_done(item, stats, manifest, records):
+    stats["processed"] += 1
+    if item.name in records:
+        manifest[item.name] = {**records[item.name], "outputs": item_outputs(item)}
+
+
+def ingest_serial(items, stats, manifest, records, ocr=OCR_ENABLED):
+    for item in items:
+        handler = get_handler(item)
+        if handler is None:
             print(f"  ⏭️ Skipping: {item.name}")
             stats["skipped"] += 1
+        elif run_handler(handler, item, ocr):
+            mark_done(item, stats, manifest, records)
+
+
+def ingest_parallel(items, stats, manifest, records, workers, ocr=OCR_ENABLED):
+    """Spread inbox items across a process pool; large PDFs are split by page range."""
+    print(f"⚙️ Parallel mode: {workers} workers")
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {}
+        split_pdfs = []
+        archives = []
+
+        for item in items:
+            handler = get_handler(item)
+            if handler is None:
+                print(f"  ⏭️ Skipping: {item.name}")
+                stats["skipped"] += 1
+                continue
+
+            if handler is extract_pdf and PYMUPDF_AVAILABLE:
+                try:
+                    ranges = pdf_page_ranges(item)
+                except Exception:
+                    ranges = []  # Let extract_pdf report the error
+                if len(ranges) > 1:
+                    print(f"  📄 Splitting PDF: {item.name} ({len(ranges)} page ranges)")
+                    # Hashed once here (the manifest check usually has it already), not per range
+                    digest = records[item.name]["hash"] if item.name in records else hash_file(item)
+                    if ocr:
+                        reset_ocr_job(item, digest)
+                    range_futures = [pool.submit(stream_pdf_pages, item, partial_path(item, s), s, e,
+                                                 ocr=ocr, source_hash=digest)
+                                     for s, e in ranges]
+                    split_pdfs.append((item, ranges, range_futures, time.time()))
+                    continue
+
+            if handler is extract_zip:
+                archives.append(item)  # Streamed here; member PDFs go to the pool
+                continue
+
+            futures[pool.submit(run_handler, handler, item, ocr)] = item
+
+        for item in archives:
+            if extract_zip(item, pool, ocr):
+                mark_done(item, stats, manifest, records)
+
+        for future in as_completed(futures):
+            try:
+                if future.result():
+                    mark_done(futures[future], stats, manifest, records)
+            except Exception as e:
+                print(f"  ❌ Worker Error ({futures[future].name}): {e}")
+
+        for item, ranges, range_futures, start in split_pdfs:
+            if finish_split_pdf(item, ranges, range_futures, start, ocr):
+                mark_done(item, stats, manifest, records)
+
+
+def inbox_items():
+    return [i for i in INBOX_DIR.iterdir()
+            if not i.name.startswith(".") and "__MACOSX" not in i.name]
+
+
+def run_pipeline(items, workers=1, force=False, ocr=OCR_ENABLED):
+    """Plan, process and record one batch of inbox items. Returns the stats."""
+    stats = {"processed": 0, "skipped": 0, "new": 0, "changed": 0, "unchanged": 0}
+    manifest = load_manifest()
+    items, records = plan_items(items, manifest, stats, force)
+
+    try:
+        if workers > 1 and items:
+            ingest_parallel(items, stats, manifest, records, workers, ocr)
+        else:
+            ingest_serial(items, stats, manifest, records, ocr)
+    finally:
+        save_manifest(manifest)
+    return stats
+
+
+def ingest_materials(workers=1, force=False, ocr=OCR_ENABLED):
+    print("🚀 Study Buddy Ingest Pipeline (v6.0 — Smart Processing)")
+    print("─" * 50)
+
+    items = inbox_items()
+    if not items:
+        print("⚠️ Inbox empty. Drop materials into /00_inbox")
+        return
+
+    start_time = time.time()
+    stats = run_pipeline(items, workers, force, ocr)
 
     elapsed = time.time() - start_time
     print(f"\n{'─' * 50}")
     print(f"✅ Done! {stats['processed']} processed, {stats['skipped']} skipped ({elapsed:.1f}s)")
+    print(f"   {stats['new']} new, {stats['changed']} changed, {stats['unchanged']} unchanged")
+    update_search_index()
+    if ocr and OLLAMA_AVAILABLE and pending_ocr_jobs():
+        start_ocr_background()
     print(f"\n📂 Current Workspace:")
     print_tree(WORK_DIR)
 
 
+# ── Watch Mode ───────────────────────────────────────────────────
+
+def item_fingerprint(path):
+    """(size, mtime) of a file — summed over a folder's files — or None once it is gone."""
+    try:
+        if path.is_dir():
+            stats = [p.stat() for p in path.rglob("*") if p.is_file()]
+            return (len(stats), sum(st.st_size for st in stats), max((st.st_mtime for st in stats), default=0))
+        st = path.stat()
+        return (st.st_size, st.st_mtime)
+    except OSError:
+        return None
+
+
+def inbox_name(path):
+    """Top-level inbox entry a changed path belongs to, or None if it should be ignored."""
+    try:
+        name = Path(path).relative_to(INBOX_DIR).parts[0]
+    except (ValueError, IndexError):
+        return None
+    if name.startswith(".") or "__MACOSX" in name or Path(name).suffix.lower() in WATCH_IGNORE_SUFFIXES:
+        return None
+    return name
+
+
+class PendingItems:
+    """Inbox entries that changed recently, released once they stop changing.
+
+    A file that is still being copied keeps changing size/mtime, so it is
+    only handed to the pipeline after WATCH_SETTLE quiet seconds.
+    """
+
+    def __init__(self, settle=WATCH_SETTLE):
+        self.settle = settle
+        self.lock = threading.Lock()
+        self.items = {}  # name → (fingerprint, time it last changed)
+
+    def touch(self, name):
+        with self.lock:
+            self.items.setdefault(name, (None, time.time()))
+
+    def settled(self):
+        now, ready = time.time(), []
+        with self.lock:
+            for name, (fingerprint, since) in list(self.items.items()):
+                path = INBOX_DIR / name
+                current = item_fingerprint(path)
+                if current is None:
+                    del self.items[name]  # Processed or deleted
+                elif current != fingerprint:
+                    self.items[name] = (current, now)
+                elif now - since >= self.settle:
+                    del self.items[name]
+                    ready.append(path)
+        return ready
+
+
+def start_event_watch(pending):
+    """Filesystem events via watchdog (inotify on Linux)."""
+    class InboxEvents(FileSystemEventHandler):
+        def on_any_event(self, event):
+            for path in (event.src_path, getattr(event, "dest_path", "")):
+                name = inbox_name(path) if path else None
+                if name:
+                    pending.touch(name)
+
+    observer = Observer()
+    observer.schedule(InboxEvents(), str(INBOX_DIR), recursive=True)
+    observer.start()
+    return observer
+
+
+def poll_inbox(pending, seen):
+    """Polling fallback: touch entries whose fingerprint differs from the last scan."""
+    current = {}
+    for item in inbox_items():
+        if inbox_name(item) is None:
+            continue
+        current[item.name] = item_fingerprint(item)
+        if seen.get(item.name) != current[item.name]:
+            pending.touch(item.name)
+    return current
+
+
+def ingest_worker(work, workers, ocr):
+    """Drain the work queue in batches until the None sentinel arrives."""
+    while True:
+        batch, stop = [work.get()], False
+        while True:
+            try:
+                batch.append(work.get_nowait())
+            except queue.Empty:
+                break
+        if None in batch:
+            stop = True
+        batch = [item for item in dict.fromkeys(batch) if item is not None and item.exists()]
+
+        if batch:
+            print(f"\n📥 {len(batch)} new: {', '.join(item.name for item in batch)}")
+            start = time.time()
+            try:
+                stats = run_pipeline(batch, workers, ocr=ocr)
+                print(f"✅ {stats['processed']} processed, {stats['skipped']} skipped "
+                      f"({time.time() - start:.1f}s)")
+                update_search_index()
+                if ocr and OLLAMA_AVAILABLE and pending_ocr_jobs():
+                    start_ocr_background()
+            except Exception as e:
+                print(f"  ❌ Ingest Error: {e}")
+        if stop:
+            return
+
+
+def watch_inbox(workers=1, force=False, ocr=OCR_ENABLED):
+    """Ingest the inbox, then keep ingesting new items as they land."""
+    ingest_materials(workers=workers, force=force, ocr=ocr)  # Catch up on anything already waiting
+
+    pending, work = PendingItems(), queue.Queue()
+    worker = threading.Thread(target=ingest_worker, args=(work, workers, ocr), daemon=True)
+    worker.start()
+    observer = start_event_watch(pending) if WATCHDOG_AVAILABLE else None
+    how = "filesystem events" if observer else f"polling every {WATCH_POLL_INTERVAL:.0f}s"
+    print(f"\n👀 Watching {INBOX_DIR.name}/ ({how}) — Ctrl+C to stop")
+    if observer is None:
+        print("   Tip: py -m pip install watchdog for instant pickup")
+
+    seen = {item.name: item_fingerprint(item) for item in inbox_items()}  # Leftovers were just handled
+    last_poll = time.time()
+    try:
+        while True:
+            if observer is None and time.time() - last_poll >= WATCH_POLL_INTERVAL:
+                seen, last_poll = poll_inbox(pending, seen), time.time()
+            for item in pending.settled():
+                work.put(item)
+            time.sleep(WATCH_TICK)
+    except KeyboardInterrupt:
+        print("\n⏳ Finishing current batch… (Ctrl+C again to abort)")
+        work.put(None)
+        worker.join()
+        print("👋 Stopped watching.")
+    finally:
+        if observer:
+            observer.stop()
+            observer.join()
+
+
+def update_search_index():
+    """Re-index only the context files that changed in this run."""
+    start = time.time()
+    index = SearchIndex(CONTEXT_DIR, SEARCH_INDEX_PATH)
+    updated, removed = index.refresh()
+    print(f"🔎 Search index: {updated} updated, {removed} removed, "
+          f"{len(index.chunks)} chunks ({time.time() - start:.1f}s)")
+
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Organize 00_inbox into 01_active_lab.")
+    parser.add_argument("--workers", type=int, default=INGEST_WORKERS,
+                        help=f"Worker processes (1 = serial). Default: {INGEST_WORKERS}")
+    parser.add_argument("--force", action="store_true",
+                        help="Ignore the manifest and re-process every item")
+    parser.add_argument("--ocr", action="store_true",
+                        help="Run queued OCR jobs for scanned PDFs in the foreground, then exit")
+    parser.add_argument("--no-ocr", action="store_true",
+                        help="Don't start the background OCR job after ingest")
+    parser.add_argument("--watch", action="store_true",
+                        help="Keep running and ingest new inbox items as they land")
+    return parser.parse_args()
+
+
 if __name__ == "__main__":
+    args = parse_args()
     setup_environment()
-    ingest_materials()
+    ocr = OCR_ENABLED and not args.no_ocr
+    if args.ocr:
+        run_ocr_jobs()
+    elif args.watch:
+        watch_inbox(workers=args.workers, force=args.force, ocr=ocr)
+    else:
+        ingest_materials(workers=args.workers, force=args.force, ocr=ocr)
@@ -0,0 +1,68 @@
+import hashlib
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+RESPONSE_CACHE_MAX_BYTES = 20 * 1024 * 1024  # Least-recently-used entries go first
+
+
+class ResponseCache:
+    """Persistent model-response cache keyed by (content hash, model, prompt).
+
+    Entries live in one SQLite file; once the stored responses exceed
+    max_bytes, the least recently used ones are evicted.
+    """
+
+    def __init__(self, path, max_bytes=RESPONSE_CACHE_MAX_BYTES):
+        self.path = Path(path)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.execute("""CREATE TABLE IF NOT EXISTS responses (
+            key TEXT PRIMARY KEY, model TEXT, response TEXT,
+            size INTEGER, created REAL, last_used REAL)""")
+        self.db.commit()
+
+    @staticmethod
+    def make_key(content_hash, model, prompt):
+        return hashlib.sha256(f"{content_hash}\0{model}\0{prompt}".encode("utf-8")).hexdigest()
+
+    def get(self, key):
+        with self.lock:
+            row = self.db.execute("SELECT response FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is None:
+                return None
+            self.db.execute("UPDATE responses SET last_used = ? WHERE key = ?", (time.time(), key))
+            self.db.commit()
+            return row[0]
+
+    def put(self, key, model, response):
+        now = time.time()
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                            (key, model, response, len(response.encode("utf-8")), now, now))
+            self.evict()
+            self.db.commit()
+
+    def evict(self):
+        total = self.db.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.db.execute("SELECT key, size FROM responses ORDER BY last_used").fetchall()
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM responses WHERE key = ?", (key,))
+            total -= size
+
+    def clear(self):
+        with self.lock:
+            self.db.execute("DELETE FROM responses")
+            self.db.commit()
+
+    def stats(self):
+        """(entries, total bytes)."""
+        with self.lock:
+            return self.db.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses").fetchone()
@@ -0,0 +1,125 @@
+import json
+import statistics
+import time
+from pathlib import Path
+
+# --- CONFIGURATION ---
+ROUTER_WINDOW = 20            # Recent turns kept per model
+SHORT_PROMPT_TOKENS = 40      # Questions this short may go to the small local model…
+SMALL_MODEL_MAX_TOKENS = 800  # …as long as the whole prompt (system + history + context) stays this small
+LARGE_CONTEXT_TOKENS = 2500   # Prompts this big go to the best measured throughput
+SLOW_FIRST_TOKEN = 30.0       # Seconds to first token that count as "slow"
+RETRY_AFTER = 300             # Seconds a failed model sits out before it is tried again
+
+
+class ModelRouter:
+    """Rolling latency / throughput record per model, and the routing rules built on it.
+
+    Samples come from Ollama's eval_count/eval_duration counters and from
+    wall-clock timings of cloud calls. They persist as JSON so routing is
+    informed from the first turn of the next session.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.models = {}  # model → {"samples": [[latency, tok_s], ...], "failed_at", "error"}
+        self.last_route = None  # (model, reason) of the latest text turn
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.models = json.load(f)
+            except (OSError, ValueError):
+                self.models = {}
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "w", encoding="utf-8") as f:
+            json.dump(self.models, f, indent=2)
+
+    def entry(self, model):
+        return self.models.setdefault(model, {"samples": [], "failed_at": None, "error": None})
+
+    # ── Measurements ─────────────────────────────────────────────
+
+    def record(self, model, latency, tokens, gen_time):
+        """One finished turn: latency = seconds to first token, or None for a non-streamed call.
+
+        A blocking call only tells us the full answer time, which would read as a
+        very slow first token, so it contributes a throughput sample only.
+        """
+        entry = self.entry(model)
+        tok_s = tokens / gen_time if tokens and gen_time and gen_time > 0 else None
+        latency = None if latency is None else round(latency, 3)
+        entry["samples"] = (entry["samples"] + [[latency, tok_s and round(tok_s, 2)]])[-ROUTER_WINDOW:]
+        entry["failed_at"], entry["error"] = None, None
+        self.save()
+
+    def record_failure(self, model, error):
+        entry = self.entry(model)
+        entry["failed_at"], entry["error"] = time.time(), str(error)[:120]
+        self.save()
+
+    def latency(self, model):
+        samples = [s[0] for s in self.models.get(model, {}).get("samples", []) if s[0] is not None]
+        return statistics.median(samples) if samples else None
+
+    def throughput(self, model):
+        samples = [s[1] for s in self.models.get(model, {}).get("samples", []) if s[1]]
+        return statistics.median(samples) if samples else None
+
+    def available(self, model):
+        failed_at = self.models.get(model, {}).get("failed_at")
+        return not failed_at or time.time() - failed_at >= RETRY_AFTER
+
+    def is_slow(self, model):
+        latency = self.latency(model)
+        return latency is not None and latency > SLOW_FIRST_TOKEN
+
+    # ── Routing ──────────────────────────────────────────────────
+
+    def route(self, primary, question_tokens, context_tokens, small=None, alternates=()):
+        """Order the models to try for one text turn. Returns (models, reason).
+
+        A short follow-up ("why?") on a long conversation is still a big prompt,
+        so context size is checked first and the small model only gets prompts
+        that are cheap as a whole.
+        """
+        order = [primary] + [m for m in alternates if m != primary]
+        reason = "mode default"
+        if context_tokens >= LARGE_CONTEXT_TOKENS:
+            measured = [m for m in order if self.throughput(m)]
+            if measured:
+                best = max(measured, key=self.throughput)
+                order.remove(best)
+                order.insert(0, best)
+                reason = (f"large context (≈{context_tokens} tok) → best throughput "
+                          f"({self.throughput(best):.1f} tok/s)")
+        elif small and question_tokens <= SHORT_PROMPT_TOKENS and context_tokens <= SMALL_MODEL_MAX_TOKENS:
+            order.insert(0, small)
+            reason = f"short prompt (≈{context_tokens} tok) → small model"
+
+        # Unavailable and slow models drop behind the healthy ones, keeping their order
+        healthy = [m for m in order if self.available(m) and not self.is_slow(m)]
+        if healthy and healthy[0] != order[0]:
+            skipped = order[0]
+            why = "unavailable" if not self.available(skipped) else f"slow, {self.latency(skipped):.0f}s to first token"
+            reason += f"; {skipped} skipped ({why})"
+        order = healthy + [m for m in order if m not in healthy]
+        return order, reason
+
+    def describe(self, model):
+        """One-line summary of what the router knows about a model."""
+        entry = self.models.get(model)
+        if not entry:
+            return "no measurements yet"
+        if not self.available(model):
+            retry = RETRY_AFTER - (time.time() - entry["failed_at"])
+            return f"unavailable ({entry['error']}) — retry in {retry / 60:.0f}m"
+        throughput, latency = self.throughput(model), self.latency(model)
+        parts = [f"{throughput:.1f} tok/s" if throughput else "tok/s n/a"]
+        if latency is not None:
+            parts.append(f"first token {latency:.1f}s")
+        parts.append(f"{len(entry['samples'])} turns")
+        if self.is_slow(model):
+            parts.append("slow")
+        return " · ".join(parts)
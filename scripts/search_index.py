@@ -0,0 +1,175 @@
+import json
+import math
+import re
+from collections import Counter
+from pathlib import Path
+
+# --- CONFIGURATION ---
+CHUNK_CHARS = 1200        # Target chunk size for indexed markdown
+INDEXED_EXTS = {'.md', '.txt'}
+BM25_K1 = 1.5
+BM25_B = 0.75
+
+STOPWORDS = {
+    "a", "an", "and", "are", "as", "at", "be", "but", "by", "for", "from", "has", "have",
+    "how", "i", "if", "in", "into", "is", "it", "its", "me", "my", "of", "on", "or", "so",
+    "that", "the", "their", "then", "there", "these", "this", "to", "was", "we", "what",
+    "when", "where", "which", "who", "why", "will", "with", "you", "your", "can", "do", "does",
+}
+
+
+def tokenize(text):
+    return [t for t in re.findall(r"[a-z0-9_]+", text.lower())
+            if len(t) > 1 and t not in STOPWORDS]
+
+
+def chunk_markdown(text):
+    """Split extracted markdown into (title, text) chunks along page/heading boundaries."""
+    chunks = []
+    for section in re.split(r"\n---\n", text):
+        section = section.strip()
+        if not section:
+            continue
+        heading = re.search(r"^#+\s+(.+)$", section, re.MULTILINE)
+        title = heading.group(1).strip() if heading else ""
+
+        # Long sections are packed paragraph by paragraph up to CHUNK_CHARS
+        current = ""
+        for para in re.split(r"\n\s*\n", section):
+            if current and len(current) + len(para) > CHUNK_CHARS:
+                chunks.append((title, current.strip()))
+                current = ""
+            current += para + "\n\n"
+        if current.strip():
+            chunks.append((title, current.strip()))
+    return chunks
+
+
+class SearchIndex:
+    """BM25 inverted index over the markdown/text files in one directory.
+
+    The index is persisted as JSON and refreshed incrementally: only files
+    whose size or mtime changed since the last refresh are re-chunked.
+    """
+
+    def __init__(self, root, index_path):
+        self.root = Path(root)
+        self.index_path = Path(index_path)
+        self.files = {}     # rel path → {"size", "mtime", "chunks": [chunk ids]}
+        self.chunks = {}    # chunk id → {"doc", "title", "text", "length"}
+        self.postings = {}  # term → {chunk id: term frequency}
+        self.next_id = 0
+        self.total_length = 0
+        self.loaded_mtime = None
+        self.load()
+
+    def load(self):
+        if not self.index_path.exists():
+            return
+        try:
+            mtime = self.index_path.stat().st_mtime
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return
+        self.files = data["files"]
+        self.chunks = data["chunks"]
+        self.postings = data["postings"]
+        self.next_id = data["next_id"]
+        self.total_length = sum(c["length"] for c in self.chunks.values())
+        self.loaded_mtime = mtime
+
+    def reload_if_changed(self):
+        """Pick up an index rewritten by another process (e.g. ingest)."""
+        if self.index_path.exists() and self.index_path.stat().st_mtime != self.loaded_mtime:
+            self.load()
+
+    def save(self):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files, "chunks": self.chunks,
+                       "postings": self.postings, "next_id": self.next_id}, f)
+        tmp_path.replace(self.index_path)
+        self.loaded_mtime = self.index_path.stat().st_mtime
+
+    # ── Incremental updates ──────────────────────────────────────
+
+    def refresh(self):
+        """Re-index changed files and drop deleted ones. Returns (updated, removed)."""
+        if not self.root.exists():
+            return 0, 0
+        seen, updated = set(), 0
+        for path in self.root.rglob("*"):
+            if path.suffix.lower() not in INDEXED_EXTS or not path.is_file():
+                continue
+            rel = path.relative_to(self.root).as_posix()
+            if any(part.startswith(".") for part in path.relative_to(self.root).parts):
+                continue
+            seen.add(rel)
+            st = path.stat()
+            record = self.files.get(rel)
+            if record and record["size"] == st.st_size and record["mtime"] == st.st_mtime:
+                continue
+            self.remove_file(rel)
+            self.add_file(rel, path.read_text(encoding="utf-8", errors="replace"), st)
+            updated += 1
+
+        removed = [rel for rel in self.files if rel not in seen]
+        for rel in removed:
+            self.remove_file(rel)
+        if updated or removed:
+            self.save()
+        return updated, len(removed)
+
+    def add_file(self, rel, text, st):
+        chunk_ids = []
+        for title, chunk_text in chunk_markdown(text):
+            terms = Counter(tokenize(chunk_text))
+            if not terms:
+                continue
+            chunk_id = str(self.next_id)
+            self.next_id += 1
+            self.chunks[chunk_id] = {"doc": rel, "title": title, "text": chunk_text,
+                                     "length": sum(terms.values())}
+            self.total_length += self.chunks[chunk_id]["length"]
+            for term, tf in terms.items():
+                self.postings.setdefault(term, {})[chunk_id] = tf
+            chunk_ids.append(chunk_id)
+        self.files[rel] = {"size": st.st_size, "mtime": st.st_mtime, "chunks": chunk_ids}
+
+    def remove_file(self, rel):
+        record = self.files.pop(rel, None)
+        if not record:
+            return
+        for chunk_id in record["chunks"]:
+            chunk = self.chunks.pop(chunk_id, None)
+            if not chunk:
+                continue
+            self.total_length -= chunk["length"]
+            for term in set(tokenize(chunk["text"])):
+                postings = self.postings.get(term)
+                if postings:
+                    postings.pop(chunk_id, None)
+                    if not postings:
+                        del self.postings[term]
+
+    # ── Querying ─────────────────────────────────────────────────
+
+    def search(self, query, k=3):
+        """Return the top-k chunks for query as [(score, chunk)], best first."""
+        if not self.chunks:
+            return []
+        total = len(self.chunks)
+        avg_length = self.total_length / total
+        scores = Counter()
+        for term in set(tokenize(query)):
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (total - len(postings) + 0.5) / (len(postings) + 0.5))
+            for chunk_id, tf in postings.items():
+                length = self.chunks[chunk_id]["length"]
+                norm = tf + BM25_K1 * (1 - BM25_B + BM25_B * length / avg_length)
+                scores[chunk_id] += idf * tf * (BM25_K1 + 1) / norm
+        return [(score, self.chunks[chunk_id]) for chunk_id, score in scores.most_common(k)]
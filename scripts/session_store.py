@@ -0,0 +1,105 @@
+import sqlite3
+import threading
+import time
+from pathlib import Path
+
+SESSION_KEEP = 50        # Older sessions are deleted when a new one starts
+TITLE_CHARS = 60
+
+
+class SessionStore:
+    """Conversation sessions persisted in SQLite so a restart can pick up where it left off.
+
+    Each session keeps its turns in order and the files read during it, by
+    path and content hash. Turns that carry a compact summary (file dumps)
+    are stored as the summary only: the raw text stays in the file, so a
+    resumed session never re-sends it.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.db = sqlite3.connect(str(self.path), check_same_thread=False)
+        self.db.executescript("""
+            CREATE TABLE IF NOT EXISTS sessions (
+                id INTEGER PRIMARY KEY AUTOINCREMENT, started REAL, updated REAL,
+                mode TEXT, title TEXT);
+            CREATE TABLE IF NOT EXISTS turns (
+                session_id INTEGER, seq INTEGER, role TEXT, content TEXT, summary TEXT,
+                created REAL, PRIMARY KEY (session_id, seq));
+            CREATE TABLE IF NOT EXISTS files (
+                session_id INTEGER, path TEXT, content_hash TEXT, chars INTEGER,
+                read_at REAL, PRIMARY KEY (session_id, path));""")
+        self.db.commit()
+
+    def create(self, mode, title):
+        now = time.time()
+        title = " ".join(title.split())
+        if len(title) > TITLE_CHARS:
+            title = title[:TITLE_CHARS - 1] + "…"
+        with self.lock:
+            session_id = self.db.execute("INSERT INTO sessions (started, updated, mode, title) VALUES (?, ?, ?, ?)",
+                                         (now, now, mode, title)).lastrowid
+            self.prune()
+            self.db.commit()
+            return session_id
+
+    def append(self, session_id, role, content, summary=None):
+        """Add one turn; when a summary is given only the summary is kept."""
+        now = time.time()
+        with self.lock:
+            seq = self.db.execute("SELECT COALESCE(MAX(seq), 0) + 1 FROM turns WHERE session_id = ?",
+                                  (session_id,)).fetchone()[0]
+            self.db.execute("INSERT INTO turns VALUES (?, ?, ?, ?, ?, ?)",
+                            (session_id, seq, role, None if summary else content, summary, now))
+            self.db.execute("UPDATE sessions SET updated = ? WHERE id = ?", (now, session_id))
+            self.db.commit()
+
+    def add_file(self, session_id, path, content_hash, chars):
+        with self.lock:
+            self.db.execute("INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?)",
+                            (session_id, path, content_hash, chars, time.time()))
+            self.db.commit()
+
+    def prune(self):
+        stale = [row[0] for row in self.db.execute(
+            "SELECT id FROM sessions ORDER BY updated DESC LIMIT -1 OFFSET ?", (SESSION_KEEP,))]
+        for session_id in stale:
+            for table, column in (("turns", "session_id"), ("files", "session_id"), ("sessions", "id")):
+                self.db.execute(f"DELETE FROM {table} WHERE {column} = ?", (session_id,))
+
+    # ── Lookup ───────────────────────────────────────────────────
+
+    def get(self, session_id):
+        """{"id", "started", "updated", "mode", "title"} or None."""
+        with self.lock:
+            row = self.db.execute("SELECT id, started, updated, mode, title FROM sessions WHERE id = ?",
+                                  (session_id,)).fetchone()
+        return dict(zip(("id", "started", "updated", "mode", "title"), row)) if row else None
+
+    def latest(self):
+        with self.lock:
+            row = self.db.execute("SELECT id FROM sessions ORDER BY updated DESC LIMIT 1").fetchone()
+        return row[0] if row else None
+
+    def recent(self, limit=10):
+        """Newest sessions first: (id, updated, mode, title, turn count)."""
+        with self.lock:
+            return self.db.execute("""
+                SELECT s.id, s.updated, s.mode, s.title, COUNT(t.seq) FROM sessions s
+                LEFT JOIN turns t ON t.session_id = s.id
+                GROUP BY s.id ORDER BY s.updated DESC LIMIT ?""", (limit,)).fetchall()
+
+    def turns(self, session_id):
+        """The session's turns in order: {"role", "content", "summary"} (content is None when summarized)."""
+        with self.lock:
+            rows = self.db.execute("SELECT role, content, summary FROM turns WHERE session_id = ? ORDER BY seq",
+                                   (session_id,)).fetchall()
+        return [{"role": role, "content": content, "summary": summary} for role, content, summary in rows]
+
+    def files(self, session_id):
+        """(path, content hash, chars) for every file read in the session."""
+        with self.lock:
+            return self.db.execute("SELECT path, content_hash, chars FROM files WHERE session_id = ? ORDER BY read_at",
+                                   (session_id,)).fetchall()
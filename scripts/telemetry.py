@@ -0,0 +1,153 @@
+import contextvars
+import json
+import statistics
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+
+# The turn being measured. Set inside each turn's task or thread; asyncio.to_thread
+# copies it into worker threads, so deep helpers can add stages without plumbing.
+current_turn = contextvars.ContextVar("current_turn", default=None)
+
+STAGE_LABELS = {
+    "retrieval": "retrieval",
+    "prompt_build": "prompt",
+    "file_read": "file read",
+    "image_prep": "image prep",
+    "upload": "upload",
+    "model": "model call",
+}
+
+
+def percentile(values, pct):
+    """Nearest-rank percentile — good enough for a handful of samples."""
+    ordered = sorted(values)
+    if not ordered:
+        return None
+    rank = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[rank]
+
+
+def format_seconds(seconds):
+    return f"{seconds * 1000:.0f}ms" if seconds < 1 else f"{seconds:.1f}s"
+
+
+class Telemetry:
+    """Per-turn timing records: tutor stages plus Ollama's own counters.
+
+    Every finished turn is appended to a JSONL file (one JSON object per
+    line) and kept in memory for the session's `stats` summary.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.session_id = time.strftime("%Y%m%d-%H%M%S")
+        self.records = []
+        self.lock = threading.Lock()
+
+    # ── Recording ────────────────────────────────────────────────
+
+    def begin(self, kind, mode):
+        turn = {"session": self.session_id, "ts": time.time(), "kind": kind, "mode": mode,
+                "brain": None, "cached": False, "status": "ok", "stages": {}, "ollama": {},
+                "ttft": None, "tokens": None, "gen_time": None, "_start": time.perf_counter()}
+        current_turn.set(turn)
+        return turn
+
+    @contextmanager
+    def stage(self, name):
+        """Time a block as one stage of the current turn (repeats add up)."""
+        turn = current_turn.get()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            if turn is not None:
+                turn["stages"][name] = turn["stages"].get(name, 0.0) + time.perf_counter() - start
+
+    def note(self, **fields):
+        turn = current_turn.get()
+        if turn is not None:
+            turn.update(fields)
+
+    def add_ollama(self, response):
+        """Accumulate the counters Ollama returns on a final response/chunk."""
+        turn = current_turn.get()
+        if turn is None:
+            return
+        counters = turn["ollama"]
+        for key in ("load_duration", "prompt_eval_duration", "eval_duration"):
+            if response.get(key):
+                counters[key] = counters.get(key, 0.0) + response[key] / 1e9
+        for key in ("prompt_eval_count", "eval_count"):
+            if response.get(key):
+                counters[key] = counters.get(key, 0) + response[key]
+
+    def finish(self, turn, status=None):
+        turn["total"] = time.perf_counter() - turn.pop("_start")
+        if status:
+            turn["status"] = status
+        counters = turn["ollama"]
+        if counters.get("eval_count") and counters.get("eval_duration"):
+            turn["tokens"], turn["gen_time"] = counters["eval_count"], counters["eval_duration"]
+        if turn["tokens"] and turn["gen_time"]:
+            turn["tokens_per_sec"] = round(turn["tokens"] / turn["gen_time"], 2)
+        with self.lock:
+            self.records.append(turn)
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write(json.dumps(turn) + "\n")
+            except OSError:
+                pass  # Metrics are best effort
+        return turn
+
+    # ── Reporting ────────────────────────────────────────────────
+
+    def breakdown(self, turn):
+        """One-line stage breakdown of a finished turn."""
+        parts = [f"{STAGE_LABELS.get(name, name)} {format_seconds(seconds)}"
+                 for name, seconds in turn["stages"].items() if seconds >= 0.001]
+        counters = turn["ollama"]
+        if counters.get("load_duration", 0) >= 0.01:
+            parts.append(f"model load {format_seconds(counters['load_duration'])}")
+        if counters.get("prompt_eval_duration"):
+            parts.append(f"prompt eval {format_seconds(counters['prompt_eval_duration'])}"
+                         f" ({counters.get('prompt_eval_count', 0)} tok)")
+        if counters.get("eval_duration"):
+            parts.append(f"generation {format_seconds(counters['eval_duration'])}"
+                         f" ({counters.get('eval_count', 0)} tok)")
+        if turn["cached"]:
+            parts.append("cached")
+        return " · ".join(parts)
+
+    def summary(self):
+        """Per-brain rows: (brain, turns, p50, p95, first-token p50, tok/s p50).
+
+        Only answered turns count; cache hits never reached the brain.
+        """
+        by_brain = {}
+        for turn in self.records:
+            if turn["status"] == "ok" and turn["brain"] and not turn["cached"]:
+                by_brain.setdefault(turn["brain"], []).append(turn)
+        rows = []
+        for brain, turns in sorted(by_brain.items()):
+            totals = [t["total"] for t in turns]
+            ttfts = [t["ttft"] for t in turns if t["ttft"] is not None]
+            rates = [t["tokens_per_sec"] for t in turns if t.get("tokens_per_sec")]
+            rows.append((brain, len(turns), percentile(totals, 50), percentile(totals, 95),
+                         statistics.median(ttfts) if ttfts else None,
+                         statistics.median(rates) if rates else None))
+        return rows
+
+    def stage_medians(self):
+        stages = {}
+        for turn in self.records:
+            for name, seconds in turn["stages"].items():
+                stages.setdefault(STAGE_LABELS.get(name, name), []).append(seconds)
+            for key, label in (("load_duration", "model load"), ("prompt_eval_duration", "prompt eval"),
+                               ("eval_duration", "generation")):
+                if turn["ollama"].get(key):
+                    stages.setdefault(label, []).append(turn["ollama"][key])
+        return {label: statistics.median(values) for label, values in stages.items()}
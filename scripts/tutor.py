@@ -1,49 +1,294 @@
+import time
+
+STARTUP_T0 = time.perf_counter()  # Before the other imports, so --profile-startup counts them
+
+import argparse
+import asyncio
+import fnmatch
+import glob
+import hashlib
+import importlib
+import itertools
+import json
 import os
+import re
+import signal
 import sys
-import time
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from pathlib import Path
 from dotenv import load_dotenv
-from google import genai
-import ollama
+
+from code_outline import CodeOutlineCache, find_symbol, format_outline
+from history import ConversationHistory, estimate_tokens
+from response_cache import ResponseCache
+from router import LARGE_CONTEXT_TOKENS, SHORT_PROMPT_TOKENS, SMALL_MODEL_MAX_TOKENS, ModelRouter
+from search_index import SearchIndex
+from session_store import SessionStore
+from telemetry import Telemetry, format_seconds
+from upload_cache import UploadCache
+from vision_prep import prepare_image
+from workspace_index import WorkspaceIndex
+
+IMPORTS_DONE = time.perf_counter()
 
 load_dotenv()  # Load API Key from .env
 
 # --- MODEL CONFIGURATION ---
 LOCAL_TEXT_MODEL = "llama3.1"         # Logic Brain — text & code
 LOCAL_VISION_MODEL = "moondream"     # Vision Brain — fastest local (~0.60 t/s)
+LOCAL_SMALL_MODEL = "llama3.2:1b"    # Quick Brain — short questions (router picks it)
 CLOUD_MODEL = "gemini-2.0-flash"     # Cloud handles both text + vision natively
+OLLAMA_KEEP_ALIVE = -1               # Keep local models resident; released on quit
 
 GEMINI_KEY = os.getenv("GEMINI_API_KEY")
 SYSTEM_PROMPT_PATH = "TUTOR_PROMPT.md"
 WORK_DIR = Path("01_active_lab")
+CONTEXT_DIR = WORK_DIR / "00_readings_and_context"
+CACHE_DIR = WORK_DIR / ".cache"
+PDF_CACHE_DIR = CACHE_DIR / "pdf_text"
+CODE_OUTLINE_DIR = CACHE_DIR / "code_outline"
+SEARCH_INDEX_PATH = CACHE_DIR / "search_index.json"
+WORKSPACE_INDEX_PATH = CACHE_DIR / "workspace_index.json"
+RESPONSE_CACHE_PATH = CACHE_DIR / "responses.sqlite3"
+UPLOAD_CACHE_PATH = CACHE_DIR / "gemini_uploads.json"
+MODEL_STATS_PATH = CACHE_DIR / "model_stats.json"
+METRICS_PATH = CACHE_DIR / "metrics.jsonl"
+SESSION_DB_PATH = CACHE_DIR / "sessions.sqlite3"
+READ_CHAR_LIMIT = 8000
+RETRIEVAL_TOP_K = 3          # Course-material chunks injected per text turn
+STREAM_OUTPUT = True         # Print text-brain tokens as they arrive
+BATCH_CONCURRENCY = {"local": 1, "cloud": 4}  # Parallel vision calls per brain in `img <dir>`
+SCAN_PAGE_SIZE = 50          # Files listed per `scan` page
+BRAIN_MENU = "Select Brain: [1] Gemini Flash (Cloud)  [2] Llama + Moondream (Local)  [3] No AI (Files Only): "
+INGEST_SCRIPT = Path(__file__).parent / "ingest.py"
+INGEST_LOG_PATH = CACHE_DIR / "ingest.log"
 
 # File type categories
 CODE_EXTS = {'.js', '.py', '.html', '.css', '.ts', '.jsx', '.tsx', '.json', '.xml'}
 TEXT_EXTS = {'.md', '.txt', '.csv', '.log'}
 IMAGE_EXTS = {'.png', '.jpg', '.jpeg', '.gif', '.bmp', '.webp', '.svg'}
 
-# Try importing PyMuPDF for PDF reading
-try:
-    import fitz
-    PYMUPDF_AVAILABLE = True
-except ImportError:
-    PYMUPDF_AVAILABLE = False
+# --- STARTUP ---
+# google.genai, ollama and fitz are imported on first use: file-only mode never
+# pays for them, and local mode never loads the cloud SDK.
+IMPORT_TIMES = {}    # module → seconds its deferred import took
+STARTUP_PHASES = [("eager imports", IMPORTS_DONE - STARTUP_T0)]  # (phase, seconds) for --profile-startup
+
+
+def lazy_import(name):
+    """Import a heavy dependency on first use, recording how long it took.
+
+    Always goes through import_module: a module another thread is still
+    importing sits half-initialized in sys.modules, and import_module waits
+    for it to finish instead of handing it back early.
+    """
+    loaded = name in sys.modules
+    start = time.perf_counter()
+    module = importlib.import_module(name)
+    if not loaded:
+        IMPORT_TIMES[name] = time.perf_counter() - start
+    return module
+
+
+def load_fitz():
+    """PyMuPDF, or None if it isn't installed."""
+    try:
+        return lazy_import("fitz")
+    except ImportError:
+        return None
+
+
+def mark_phase(name):
+    """Close a startup phase that began where the previous one ended."""
+    now = time.perf_counter()
+    previous = STARTUP_T0 + sum(seconds for _, seconds in STARTUP_PHASES)
+    STARTUP_PHASES.append((name, now - previous))
+
+
+def print_startup_profile():
+    print("\n⏱️ Startup profile:")
+    for name, seconds in STARTUP_PHASES:
+        print(f"  {name:<28} {seconds * 1000:8.1f} ms")
+    ready = sum(seconds for name, seconds in STARTUP_PHASES if not name.startswith("waiting"))
+    print(f"  {'launch → prompt (no waits)':<28} {ready * 1000:8.1f} ms")
+    print("  Deferred imports:")
+    for name in ("google.genai", "ollama", "fitz"):
+        took = IMPORT_TIMES.get(name)
+        state = f"{took * 1000:8.1f} ms" if took is not None else "   not loaded"
+        print(f"    {name:<26} {state}")
+
+
+def file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def parse_page_spec(spec, page_count):
+    """Turn '5', '3-7', '2,9-11' or '10-' into sorted 0-based page indexes."""
+    pages = set()
+    for part in spec.replace(" ", "").split(","):
+        if not part:
+            continue
+        if "-" in part:
+            first, _, last = part.partition("-")
+            first = int(first) if first else 1
+            last = int(last) if last else page_count
+        else:
+            first = last = int(part)
+        if first < 1 or last < first:
+            raise ValueError(f"bad page range '{part}'")
+        pages.update(range(first - 1, min(last, page_count)))
+    return sorted(pages)
+
+
+def format_page_spec(numbers):
+    """Turn sorted 1-based page numbers into a spec like '2,9-11' (the inverse of parse_page_spec)."""
+    runs = []
+    for number in numbers:
+        if runs and number == runs[-1][1] + 1:
+            runs[-1][1] = number
+        else:
+            runs.append([number, number])
+    return ",".join(str(a) if a == b else f"{a}-{b}" for a, b in runs)
+
+
+class PdfTextCache:
+    """Per-page PDF text cache on disk, keyed by file content hash.
+
+    A small index maps path → (size, mtime, hash) so unchanged files are
+    never re-hashed; pages are extracted only the first time they are read.
+    """
+
+    def __init__(self, root=PDF_CACHE_DIR):
+        self.root = root
+        self.index_path = root / "index.json"
+        self.index = {}
+        if self.index_path.exists():
+            try:
+                with open(self.index_path, "r", encoding="utf-8") as f:
+                    self.index = json.load(f)
+            except (OSError, ValueError):
+                self.index = {}
+
+    def doc_key(self, path):
+        st = path.stat()
+        key = str(path.resolve())
+        record = self.index.get(key)
+        if record and record["size"] == st.st_size and record["mtime"] == st.st_mtime:
+            return record["hash"]
+        digest = file_hash(path)
+        self.index[key] = {"size": st.st_size, "mtime": st.st_mtime, "hash": digest}
+        self.root.mkdir(parents=True, exist_ok=True)
+        with open(self.index_path, "w", encoding="utf-8") as f:
+            json.dump(self.index, f)
+        return digest
+
+    def read_pages(self, path, page_spec=None, char_limit=READ_CHAR_LIMIT):
+        """Return (page_count, [(page_number, text)]) for the requested pages.
+
+        Without a page spec, pages are read from the start until char_limit
+        is reached, so only as much of the document as fits is parsed.
+        """
+        doc_dir = self.root / self.doc_key(path)
+        doc_dir.mkdir(parents=True, exist_ok=True)
+        meta_path = doc_dir / "meta.json"
+        doc = None
+
+        try:
+            if meta_path.exists():
+                with open(meta_path, "r", encoding="utf-8") as f:
+                    page_count = json.load(f)["page_count"]
+            else:
+                doc = load_fitz().open(str(path))
+                page_count = doc.page_count
+                with open(meta_path, "w", encoding="utf-8") as f:
+                    json.dump({"page_count": page_count, "name": path.name}, f)
+
+            indexes = parse_page_spec(page_spec, page_count) if page_spec else range(page_count)
+            pages, total_chars = [], 0
+            for index in indexes:
+                page_path = doc_dir / f"p{index + 1:05d}.txt"
+                if page_path.exists():
+                    text = page_path.read_text(encoding="utf-8")
+                else:
+                    if doc is None:
+                        doc = load_fitz().open(str(path))
+                    text = doc[index].get_text()
+                    page_path.write_text(text, encoding="utf-8")
+                pages.append((index + 1, text))
+                total_chars += len(text)
+                if total_chars >= char_limit:
+                    break
+            return page_count, pages
+        finally:
+            if doc is not None:
+                doc.close()
 
 
 class HybridTutor:
     def __init__(self):
         self.mode = "local"
-        self.history = []
-        self.system_prompt = self.load_system_prompt()
+        self.history = ConversationHistory()
+        self.stream = STREAM_OUTPUT
+        self.stream_stats = None  # Set by a streamed turn: ttft, tokens, generation time
+        self.turn_load_time = 0.0  # Model load seconds Ollama reported for this turn
+        self.warmup = {}           # model → {"status", "load_time"}
+        self.warmup_thread = None
+        self.quiet = False  # Batch jobs silence per-call status lines
+        self.cancel_event = threading.Event()  # Replaced per model job; set to stop it
+        self.model_lock = None  # asyncio.Lock — model jobs run one at a time
+        self.jobs = {}          # id → {"kind", "label", "state", "task", "started"}
+        self.job_ids = itertools.count(1)
+        self.base_prompt = self.load_system_prompt()
+        self._system_prompt = None  # Base prompt + workspace map, built on first model call
         self.gemini_client = None
         self.gemini_chat = None
-        # Explicit localhost to avoid OLLAMA_HOST=0.0.0.0 connection issues
-        self.ollama_client = ollama.Client(host='http://localhost:11434')
+        self.pdf_cache = PdfTextCache()
+        self.outline_cache = CodeOutlineCache(CODE_OUTLINE_DIR)
+        self.workspace = WorkspaceIndex(WORK_DIR, WORKSPACE_INDEX_PATH)
+        self.response_cache = ResponseCache(RESPONSE_CACHE_PATH)
+        self.use_cache = True
+        self.upload_cache = UploadCache(UPLOAD_CACHE_PATH)
+        self.router = ModelRouter(MODEL_STATS_PATH)
+        self.telemetry = Telemetry(METRICS_PATH)
+        self.sessions = SessionStore(SESSION_DB_PATH)
+        self.session_id = None  # Created with the first recorded turn, or set by `resume`
+        self.session_lock = threading.Lock()
+        self.cloud_chat_stale = False  # Gemini chat differs from the history: reseed after this turn
+        self.tokens_shown = 0  # Streamed chunks printed by the current attempt (no fallback after output)
+        self._search_index = None
+        self._ollama_client = None
+        self.client_lock = threading.Lock()
+
+    @property
+    def system_prompt(self):
+        if self._system_prompt is None:
+            # Auto-discover workspace and inject into system prompt
+            prompt = self.base_prompt
+            workspace_map = self.build_workspace_map()
+            if workspace_map:
+                prompt += f"\n\n**🗺️ WORKSPACE MAP (auto-discovered):**\n```\n{workspace_map}\n```"
+            self._system_prompt = prompt
+        return self._system_prompt
+
+    @property
+    def search_index(self):
+        if self._search_index is None:
+            self._search_index = SearchIndex(CONTEXT_DIR, SEARCH_INDEX_PATH)
+            self._search_index.refresh()
+        return self._search_index
 
-        # Auto-discover workspace and inject into system prompt
-        workspace_map = self.build_workspace_map()
-        if workspace_map:
-            self.system_prompt += f"\n\n**🗺️ WORKSPACE MAP (auto-discovered):**\n```\n{workspace_map}\n```"
+    @property
+    def ollama_client(self):
+        with self.client_lock:  # The warm-up thread and the first turn can race here
+            if self._ollama_client is None:
+                # Explicit localhost to avoid OLLAMA_HOST=0.0.0.0 connection issues
+                self._ollama_client = lazy_import("ollama").Client(host='http://localhost:11434')
+            return self._ollama_client
 
     def load_system_prompt(self):
         if os.path.exists(SYSTEM_PROMPT_PATH):
@@ -52,31 +297,28 @@ class HybridTutor:
         return "You are a helpful coding tutor."
 
     def build_workspace_map(self):
-        """Scan 01_active_lab/ and build a tree map for the AI."""
+        """Build a tree map of 01_active_lab/ for the AI from the workspace index."""
         if not WORK_DIR.exists():
             return ""
+        self.workspace.refresh()
 
         lines = []
-        for item in sorted(WORK_DIR.iterdir()):
-            if item.name.startswith(".") or not item.is_dir():
-                continue
-            lines.append(f"📂 {item.name}/")
+        for name in self.workspace.children("")[0]:
+            lines.append(f"📂 {name}/")
             # Show 2 levels deep
-            for child in sorted(item.iterdir()):
-                if child.name.startswith("."):
-                    continue
-                if child.is_dir():
-                    lines.append(f"    📂 {child.name}/")
-                    for grandchild in sorted(child.iterdir()):
-                        if grandchild.name.startswith("."):
-                            continue
-                        if grandchild.is_dir():
-                            file_count = sum(1 for _ in grandchild.rglob("*") if _.is_file())
-                            lines.append(f"        📂 {grandchild.name}/ ({file_count} files)")
+            child_dirs, child_files = self.workspace.children(name)
+            for child in sorted(child_dirs + child_files):
+                if child in child_dirs:
+                    lines.append(f"    📂 {child}/")
+                    grand_dirs, grand_files = self.workspace.children(f"{name}/{child}")
+                    for grandchild in sorted(grand_dirs + grand_files):
+                        if grandchild in grand_dirs:
+                            file_count = self.workspace.count_files(f"{name}/{child}/{grandchild}")
+                            lines.append(f"        📂 {grandchild}/ ({file_count} files)")
                         else:
-                            lines.append(f"        📄 {grandchild.name}")
+                            lines.append(f"        📄 {grandchild}")
                 else:
-                    lines.append(f"    📄 {child.name}")
+                    lines.append(f"    📄 {child}")
 
         return "\n".join(lines) if lines else ""
 
@@ -87,29 +329,259 @@ class HybridTutor:
             print("⚠️ Error: GEMINI_API_KEY missing in .env file.")
             return False
         try:
+            genai = lazy_import("google.genai")
             self.gemini_client = genai.Client(api_key=GEMINI_KEY)
-            self.gemini_chat = self.gemini_client.chats.create(
-                model=CLOUD_MODEL,
-                config={"system_instruction": self.system_prompt}
-            )
+            self.gemini_chat = self.new_cloud_chat()
             return True
         except Exception as e:
             print(f"❌ Connection Error: {e}")
             return False
 
+    def new_cloud_chat(self):
+        """A Gemini chat seeded with the whole conversation so far (old file dumps as their summary).
+
+        Not the budgeted messages() view: that trims older answers for the small
+        local context, and the chat is rebuilt after every grounded turn.
+        """
+        history = [{"role": "model" if m["role"] == "assistant" else "user", "parts": [{"text": m["content"]}]}
+                   for m in self.history.transcript()]
+        return self.gemini_client.chats.create(
+            model=CLOUD_MODEL,
+            config={"system_instruction": self.system_prompt},
+            history=history
+        )
+
+    # ── Retrieval ────────────────────────────────────────────────
+
+    def ground_prompt(self, user_input):
+        """Prepend the top-k relevant course-material chunks to a text question."""
+        self.search_index.reload_if_changed()
+        hits = self.search_index.search(user_input, k=RETRIEVAL_TOP_K)
+        if not hits:
+            return user_input
+        print(f"\n📚 Grounded on {len(hits)} chunks from course material", end="", flush=True)
+        blocks = []
+        for _, chunk in hits:
+            source = f"{chunk['doc']} · {chunk['title']}" if chunk["title"] else chunk["doc"]
+            blocks.append(f"[{source}]\n{chunk['text']}")
+        context = "\n\n".join(blocks)
+        return f"Relevant course material:\n\n{context}\n\n---\n\nQUESTION: {user_input}"
+
+    def status(self, message):
+        """Inline progress note (suppressed while a batch job runs)."""
+        if not self.quiet:
+            print(message, end="", flush=True)
+
+    def report_prompt_size(self, history, prompt):
+        system_tokens = estimate_tokens(self.system_prompt)
+        history_tokens = sum(estimate_tokens(m['content']) for m in history)
+        prompt_tokens = estimate_tokens(prompt)
+        total = system_tokens + history_tokens + prompt_tokens
+        print(f"\n📏 Prompt ≈ {total} tokens (system {system_tokens} + history {history_tokens} "
+              f"[{len(history)} msgs] + input {prompt_tokens})", end="", flush=True)
+
     # ── Text Brains ──────────────────────────────────────────────
 
-    def chat_local(self, user_input):
-        messages = [{'role': 'system', 'content': self.system_prompt}] + self.history
-        messages.append({'role': 'user', 'content': user_input})
-        print(f"\n🧠 (Local {LOCAL_TEXT_MODEL}) Thinking...", end="", flush=True)
-        response = self.ollama_client.chat(model=LOCAL_TEXT_MODEL, messages=messages)
-        return response['message']['content']
+    def chat_text(self, user_input, stream=False):
+        """Answer a text question on the brain the router picks, falling back down its list."""
+        with self.telemetry.stage("retrieval"):
+            prompt = self.ground_prompt(user_input)
+        context_tokens = (estimate_tokens(self.system_prompt) + self.history.token_estimate()
+                          + estimate_tokens(prompt))
+        if self.mode == "cloud":
+            primary, alternates = CLOUD_MODEL, [LOCAL_TEXT_MODEL]
+        else:
+            primary, alternates = LOCAL_TEXT_MODEL, [CLOUD_MODEL] if self.gemini_chat else []
+        # The small model only stands in for the local brain: a cloud-mode turn answered
+        # locally never reaches the Gemini chat's history. RESCUE wants a full solution.
+        small = LOCAL_SMALL_MODEL if self.mode == "local" and "RESCUE" not in user_input.upper() else None
+        order, reason = self.router.route(primary, estimate_tokens(user_input), context_tokens,
+                                          small=small, alternates=alternates)
+        if reason != "mode default":
+            self.status(f"\n🧭 Routed to {order[0]}: {reason}")
+
+        for attempt, model in enumerate(order):
+            self.router.last_route = (model, reason if attempt == 0 else f"fallback from {order[0]}")
+            self.tokens_shown = 0
+            try:
+                if model == CLOUD_MODEL:
+                    answer = self.chat_cloud(prompt, stream=stream)
+                    # The Gemini chat keeps every prompt it is sent; reseed it from the
+                    # history (plain question + answer) so retrieved chunks don't pile up
+                    self.cloud_chat_stale = prompt != user_input
+                    return answer
+                answer = self.chat_local(prompt, stream=stream, model=model)
+                # Fallback or throughput routing answered a cloud-mode turn locally:
+                # reseed the Gemini chat once this turn is in the history
+                self.cloud_chat_stale = self.mode == "cloud"
+                return answer
+            except Exception as e:
+                self.router.record_failure(model, e)
+                if self.tokens_shown or attempt == len(order) - 1:
+                    raise
+                print(f"\n↪️ {model} unavailable ({e}) — falling back to {order[attempt + 1]}",
+                      end="", flush=True)
 
-    def chat_cloud(self, user_input):
+    def chat_local(self, prompt, stream=False, model=LOCAL_TEXT_MODEL):
+        with self.telemetry.stage("prompt_build"):
+            history = self.history.messages()
+            messages = [{'role': 'system', 'content': self.system_prompt}] + history
+            messages.append({'role': 'user', 'content': prompt})
+        self.report_prompt_size(history, prompt)
+        self.telemetry.note(brain=model)
+        print(f"\n🧠 (Local {model}) Thinking...", end="", flush=True)
+        if not stream:
+            with self.telemetry.stage("model"):
+                response = self.ollama_client.chat(model=model, messages=messages,
+                                                   keep_alive=OLLAMA_KEEP_ALIVE)
+            self.record_load_time(response)
+            # No first token to time here — only the throughput sample counts
+            self.router.record(model, None, response.get('eval_count'),
+                               (response.get('eval_duration') or 0) / 1e9)
+            return response['message']['content']
+
+        cancel = self.cancel_event
+        start, first_token, parts, last = time.time(), None, [], None
+        with self.telemetry.stage("model"):
+            stream_response = self.ollama_client.chat(model=model, messages=messages, stream=True,
+                                                      keep_alive=OLLAMA_KEEP_ALIVE)
+            for chunk in stream_response:
+                if cancel.is_set():
+                    stream_response.close()  # Drops the connection, so Ollama stops generating
+                    parts.append(" [stopped]")
+                    last = None
+                    break
+                last = chunk
+                first_token = self.print_token(chunk['message']['content'], start, first_token)
+                parts.append(chunk['message']['content'])
+        text = "".join(parts)
+
+        # Ollama's final chunk carries exact generation counters
+        if last is not None:
+            self.record_load_time(last)
+        if last is not None and last.get('eval_count'):
+            tokens, gen_time = last['eval_count'], last['eval_duration'] / 1e9
+        else:
+            tokens, gen_time = estimate_tokens(text), time.time() - start - (first_token or 0)
+        self.stream_stats = {"ttft": first_token, "tokens": tokens, "gen_time": gen_time}
+        self.telemetry.note(**self.stream_stats)
+        if last is not None and first_token is not None:
+            load_time = (last.get('load_duration') or 0) / 1e9
+            self.router.record(model, max(0.0, first_token - load_time), tokens, gen_time)
+        return text
+
+    def chat_cloud(self, prompt, stream=False):
+        self.telemetry.note(brain=CLOUD_MODEL)
         print(f"\n☁️ (Cloud {CLOUD_MODEL}) Thinking...", end="", flush=True)
-        response = self.gemini_chat.send_message(user_input)
-        return response.text
+        if not stream:
+            start = time.time()
+            with self.telemetry.stage("model"):
+                response = self.gemini_chat.send_message(prompt)
+            usage = getattr(response, "usage_metadata", None)
+            elapsed = time.time() - start
+            tokens = getattr(usage, "candidates_token_count", None) or estimate_tokens(response.text or "")
+            self.router.record(CLOUD_MODEL, None, tokens, elapsed)
+            self.telemetry.note(tokens=tokens, gen_time=elapsed,
+                                prompt_tokens=getattr(usage, "prompt_token_count", None))
+            return response.text
+
+        cancel = self.cancel_event
+        start, first_token, parts, usage = time.time(), None, [], None
+        with self.telemetry.stage("model"):
+            for chunk in self.gemini_chat.send_message_stream(prompt):
+                if cancel.is_set():
+                    parts.append(" [stopped]")
+                    break
+                usage = getattr(chunk, "usage_metadata", None) or usage
+                first_token = self.print_token(chunk.text or "", start, first_token)
+                parts.append(chunk.text or "")
+        text = "".join(parts)
+
+        tokens = getattr(usage, "candidates_token_count", None) or estimate_tokens(text)
+        gen_time = time.time() - start - (first_token or 0)
+        self.stream_stats = {"ttft": first_token, "tokens": tokens, "gen_time": gen_time}
+        self.telemetry.note(prompt_tokens=getattr(usage, "prompt_token_count", None), **self.stream_stats)
+        if first_token is not None and not cancel.is_set():
+            self.router.record(CLOUD_MODEL, first_token, tokens, gen_time)
+        return text
+
+    def print_token(self, text, start, first_token):
+        """Echo one streamed chunk; returns time-to-first-token once known."""
+        if not text:
+            return first_token
+        self.tokens_shown += 1
+        if first_token is None:
+            first_token = time.time() - start
+            print("\n\nTutor: ", end="", flush=True)
+        print(text, end="", flush=True)
+        return first_token
+
+    def format_stream_stats(self, elapsed):
+        stats = self.stream_stats
+        ttft = self.format_time(stats["ttft"]) if stats["ttft"] is not None else "n/a"
+        rate = stats["tokens"] / stats["gen_time"] if stats["gen_time"] > 0 else 0.0
+        return (f"\n\n⏱️ first token {ttft} | {stats['tokens']} tokens @ {rate:.1f} tok/s"
+                f" | total {self.format_time(elapsed)}{self.format_load_note()}")
+
+    # ── Model Warm-up ────────────────────────────────────────────
+
+    def preload_model(self, model):
+        """Load a model into Ollama's memory and pin it with keep_alive (blocking)."""
+        self.warmup[model] = {"status": "loading", "load_time": None}
+        start = time.time()
+        try:
+            response = self.ollama_client.generate(model=model, prompt="", keep_alive=OLLAMA_KEEP_ALIVE)
+            load_time = (response.get('load_duration') or 0) / 1e9 or time.time() - start
+            self.warmup[model] = {"status": "ready", "load_time": load_time}
+        except Exception as e:
+            self.warmup[model] = {"status": f"failed ({e})", "load_time": None}
+
+    def workspace_has_images(self):
+        images_dir = CONTEXT_DIR / "images"
+        if not images_dir.is_dir():
+            return False
+        with os.scandir(images_dir) as entries:
+            return any(Path(e.name).suffix.lower() in IMAGE_EXTS for e in entries)
+
+    def start_warmup(self):
+        """Preload the local brains in a background thread so the first query doesn't pay for it.
+
+        The vision model is only loaded speculatively when the workspace has images.
+        """
+        if self.warmup_thread and self.warmup_thread.is_alive():
+            return
+
+        def run():
+            if self.warmup.get(LOCAL_TEXT_MODEL, {}).get("status") != "ready":
+                self.preload_model(LOCAL_TEXT_MODEL)
+            if self.warmup.get(LOCAL_VISION_MODEL, {}).get("status") != "ready" and self.workspace_has_images():
+                self.preload_model(LOCAL_VISION_MODEL)
+
+        self.warmup_thread = threading.Thread(target=run, name="ollama-warmup", daemon=True)
+        self.warmup_thread.start()
+
+    def release_models(self):
+        """Let Ollama unload the models this session pinned."""
+        for model in (LOCAL_TEXT_MODEL, LOCAL_SMALL_MODEL, LOCAL_VISION_MODEL):
+            if self.warmup.get(model, {}).get("status") == "ready":
+                try:
+                    self.ollama_client.generate(model=model, prompt="", keep_alive=0)
+                except Exception:
+                    pass  # Ollama already gone — nothing to release
+
+    def record_load_time(self, response):
+        self.telemetry.add_ollama(response)
+        load_time = (response.get('load_duration') or 0) / 1e9
+        self.turn_load_time += load_time
+        if load_time and response.get('model'):
+            # A chat call can (re)load a model too — it stays pinned either way
+            model = response['model'].removesuffix(":latest")
+            self.warmup[model] = {"status": "ready", "load_time": load_time}
+
+    def format_load_note(self):
+        if self.turn_load_time < 0.1:
+            return ""
+        return f" (incl. model load {self.format_time(self.turn_load_time)})"
 
     # ── Vision Brains ────────────────────────────────────────────
 
@@ -119,15 +591,26 @@ class HybridTutor:
         if not Path(abs_path).exists():
             return f"❌ Image not found: {image_path}"
 
-        print(f"\n👁️ (Local {LOCAL_VISION_MODEL}) Analyzing image...", end="", flush=True)
+        question = question or "Describe this image in detail."
+        return self.cached_call(file_hash(abs_path), LOCAL_VISION_MODEL, question,
+                                lambda: self.run_vision_local(abs_path, question))
+
+    def run_vision_local(self, abs_path, question):
+        with self.telemetry.stage("image_prep"):
+            image = prepare_image(abs_path, LOCAL_VISION_MODEL, verbose=not self.quiet)
+        self.telemetry.note(brain=LOCAL_VISION_MODEL)
+        self.status(f"\n👁️ (Local {LOCAL_VISION_MODEL}) Analyzing image...")
         messages = [
             {
                 'role': 'user',
-                'content': question or "Describe this image in detail.",
-                'images': [abs_path],
+                'content': question,
+                'images': [image],
             }
         ]
-        response = self.ollama_client.chat(model=LOCAL_VISION_MODEL, messages=messages)
+        with self.telemetry.stage("model"):
+            response = self.ollama_client.chat(model=LOCAL_VISION_MODEL, messages=messages,
+                                               keep_alive=OLLAMA_KEEP_ALIVE)
+        self.record_load_time(response)
         return response['message']['content']
 
     def chat_vision_cloud(self, image_path, question):
@@ -136,61 +619,263 @@ class HybridTutor:
         if not Path(abs_path).exists():
             return f"❌ Image not found: {image_path}"
 
-        print(f"\n☁️👁️ (Cloud {CLOUD_MODEL} Vision) Analyzing image...", end="", flush=True)
+        prompt = f"USER QUESTION about the image: {question or 'Describe this image in detail.'}"
+        return self.cached_call(file_hash(abs_path), CLOUD_MODEL, prompt,
+                                lambda: self.run_vision_cloud(abs_path, prompt))
+
+    def run_vision_cloud(self, abs_path, prompt):
+        with self.telemetry.stage("image_prep"):
+            image = prepare_image(abs_path, CLOUD_MODEL, verbose=not self.quiet)
+        self.telemetry.note(brain=CLOUD_MODEL)
+        self.status(f"\n☁️👁️ (Cloud {CLOUD_MODEL} Vision) Analyzing image...")
         try:
-            uploaded = self.gemini_client.files.upload(file=abs_path)
-            prompt = f"USER QUESTION about the image: {question or 'Describe this image in detail.'}"
-            response = self.gemini_client.models.generate_content(
-                model=CLOUD_MODEL,
-                contents=[prompt, uploaded]
-            )
+            image_hash = file_hash(image)
+            uploaded, reused = self.upload_file(image, image_hash)
+            try:
+                with self.telemetry.stage("model"):
+                    response = self.gemini_client.models.generate_content(
+                        model=CLOUD_MODEL,
+                        contents=[prompt, uploaded]
+                    )
+            except Exception:
+                if not reused:
+                    raise
+                # Handle was deleted or expired server-side — upload fresh and retry once
+                self.upload_cache.forget(image_hash)
+                uploaded, _ = self.upload_file(image, image_hash)
+                with self.telemetry.stage("model"):
+                    response = self.gemini_client.models.generate_content(
+                        model=CLOUD_MODEL,
+                        contents=[prompt, uploaded]
+                    )
             return response.text
         except Exception as e:
             return f"❌ Cloud vision error: {e}"
 
+    def upload_file(self, path, content_hash):
+        """Upload a file to Gemini, or reuse a live handle for the same bytes. Returns (file, reused)."""
+        entry = self.upload_cache.get(content_hash)
+        if entry:
+            hours_left = (entry["expires"] - time.time()) / 3600
+            self.status(f"\n📎 Reusing uploaded file {entry['name']} (expires in {hours_left:.0f}h)")
+            types = lazy_import("google.genai.types")
+            return types.Part.from_uri(file_uri=entry["uri"], mime_type=entry["mime_type"]), True
+        with self.telemetry.stage("upload"):
+            uploaded = self.gemini_client.files.upload(file=path)
+        self.upload_cache.put(content_hash, uploaded)
+        return uploaded, False
+
+    # ── Response Cache ───────────────────────────────────────────
+
+    def cached_call(self, content_hash, model, prompt, compute):
+        """Return a cached answer for (content, model, prompt), or compute and store one."""
+        key = ResponseCache.make_key(content_hash, model, prompt)
+        if self.use_cache:
+            cached = self.response_cache.get(key)
+            if cached is not None:
+                self.status(f"\n♻️ Cached answer ({model}) — `cache off` to bypass")
+                self.telemetry.note(brain=model, cached=True)
+                return cached
+        response = compute()
+        if response and not response.startswith("❌"):
+            self.response_cache.put(key, model, response)
+        return response
+
+    def summarize_file(self, content):
+        """AI summary of a freshly read file, served from the response cache when possible."""
+        prompt = f"I just loaded this file. Here's the content:\n\n{content}\n\nGive me a brief summary of what this file does."
+        content_hash = hashlib.sha256(content.encode("utf-8")).hexdigest()
+        if self.mode == "cloud":
+            def compute():
+                self.cloud_chat_stale = True  # The raw file text must not stay in the chat
+                return self.chat_cloud(prompt)
+            return self.cached_call(content_hash, CLOUD_MODEL, prompt, compute)
+        return self.cached_call(content_hash, LOCAL_TEXT_MODEL, prompt, lambda: self.chat_local(prompt))
+
+    def cache_command(self, arg):
+        if arg == "clear":
+            self.response_cache.clear()
+            print("🧹 Response cache cleared.")
+        elif arg in ("on", "off"):
+            self.use_cache = arg == "on"
+            print(f"🔄 Response cache {'ON' if self.use_cache else 'OFF (bypassed)'}.")
+        entries, size = self.response_cache.stats()
+        print(f"♻️ Cache: {entries} responses, {size / 1024:.0f} KB "
+              f"(limit {self.response_cache.max_bytes // (1024 * 1024)} MB) — {'on' if self.use_cache else 'bypassed'}")
+
+    # ── Batch Vision ─────────────────────────────────────────────
+
+    def expand_image_targets(self, target):
+        """Image files named by a directory or glob (tried as given, then under WORK_DIR)."""
+        for base in (Path("."), WORK_DIR):
+            candidate = base / target
+            if candidate.is_dir():
+                paths = [p for p in candidate.iterdir() if p.is_file()]
+            elif any(c in target for c in "*?["):
+                # glob.glob, not Path.glob: absolute patterns (/home/me/shots/*.png) are valid here
+                paths = [Path(p) for p in glob.glob(os.path.join(base, target))]
+            else:
+                continue
+            images = sorted(p for p in paths if p.suffix.lower() in IMAGE_EXTS)
+            if images:
+                return images
+        return []
+
+    def batch_report_path(self, target, question, model):
+        key = hashlib.sha256(f"{target}\0{question}\0{model}".encode("utf-8")).hexdigest()[:10]
+        return CONTEXT_DIR / f"vision_batch_{key}.md"
+
+    def run_vision_batch(self, target, question):
+        """Run one question over many images with bounded concurrency.
+
+        Each answer is appended to a markdown report in CONTEXT_DIR as soon as
+        it arrives; re-running the same command skips images already in it.
+        """
+        images = self.expand_image_targets(target)
+        if not images:
+            return f"❌ No images found for: {target}"
+
+        model = CLOUD_MODEL if self.mode == "cloud" else LOCAL_VISION_MODEL
+        vision = self.chat_vision_cloud if self.mode == "cloud" else self.chat_vision_local
+        report = self.batch_report_path(target, question, model)
+        done = set()
+        if report.exists():
+            done = set(re.findall(r"^## (.+)$", report.read_text(encoding="utf-8"), re.MULTILINE))
+        else:
+            report.parent.mkdir(parents=True, exist_ok=True)
+            with open(report, "w", encoding="utf-8") as f:
+                f.write(f"# Vision batch: {question or 'Describe this image in detail.'}\n\n"
+                        f"- Source: `{target}`\n- Model: {model}\n"
+                        f"- Started: {time.strftime('%Y-%m-%d %H:%M')}\n\n")
+
+        todo = [p for p in images if p.as_posix() not in done]
+        workers = BATCH_CONCURRENCY.get(self.mode, 1)
+        print(f"\n🗂️ Batch: {len(images)} images ({len(images) - len(todo)} already done), "
+              f"{workers} at a time → {report}")
+
+        finished, failed = len(images) - len(todo), 0
+        cancel = self.cancel_event
+        self.quiet = True
+        pool = ThreadPoolExecutor(max_workers=workers)
+        try:
+            futures = {pool.submit(vision, str(p), question): p for p in todo}
+            for future in as_completed(futures):
+                if cancel.is_set():
+                    pool.shutdown(wait=False, cancel_futures=True)
+                    return f"⏸️ Batch stopped — partial results in {report}. Re-run the same command to resume."
+                path = futures[future]
+                try:
+                    answer = future.result()
+                except Exception as e:
+                    answer = f"❌ {e}"
+                finished += 1
+                if answer.startswith("❌"):
+                    failed += 1
+                    print(f"  [{finished}/{len(images)}] ❌ {path.name}: {answer}")
+                    continue  # Not written, so a re-run retries it
+                with open(report, "a", encoding="utf-8") as f:
+                    f.write(f"## {path.as_posix()}\n\n{answer.strip()}\n\n---\n\n")
+                print(f"  [{finished}/{len(images)}] ✅ {path.name}")
+        finally:
+            self.quiet = False
+            pool.shutdown(wait=True)
+
+        return f"✅ Batch done: {len(images) - failed}/{len(images)} images answered → {report}"
+
     # ── Smart File Reader ────────────────────────────────────────
 
-    def read_file(self, file_path):
-        """Smart file reader — picks the right tool based on extension."""
+    def split_page_spec(self, file_path):
+        """Split 'notes.pdf 3-7' into ('notes.pdf', '3-7'); other paths pass through."""
+        match = re.match(r"^(.+?\.pdf)\s+([\d,\-\s]+)$", file_path, re.IGNORECASE)
+        if match and not Path(file_path).exists():
+            return match.group(1), match.group(2).strip()
+        return file_path, None
+
+    def split_symbol(self, file_path):
+        """Split 'app.js:render' into ('app.js', 'render'); other paths pass through."""
+        name, sep, symbol = file_path.rpartition(":")
+        if sep and symbol and Path(name).suffix.lower() in CODE_EXTS and self.resolve_path(file_path) is None:
+            return name, symbol.strip()
+        return file_path, None
+
+    def resolve_path(self, file_path):
+        """The file as given, else relative to the work dir; None if neither exists."""
         path = Path(file_path)
         if not path.exists():
-            # Try relative to work dir
             path = WORK_DIR / file_path
-        if not path.exists():
+        return path if path.exists() else None
+
+    def read_file(self, file_path):
+        """Smart file reader — picks the right tool based on extension."""
+        file_path, page_spec = self.split_page_spec(file_path)
+        file_path, symbol = self.split_symbol(file_path)
+        path = self.resolve_path(file_path)
+        if path is None:
             return f"❌ File not found: {file_path}"
 
         ext = path.suffix.lower()
 
-        # PDF → PyMuPDF instant extraction
+        # PDF → PyMuPDF extraction, only the requested pages, cached per page
         if ext == '.pdf':
-            if not PYMUPDF_AVAILABLE:
+            if load_fitz() is None:
                 return "❌ PyMuPDF not installed. Run: py -m pip install PyMuPDF"
             print(f"\n📄 Reading PDF with PyMuPDF...", end="", flush=True)
             try:
-                doc = fitz.open(str(path))
-                text = ""
-                for page in doc:
-                    text += page.get_text() + "\n"
-                doc.close()
-                if not text.strip():
-                    return "⚠️ PDF appears to be scanned (no extractable text). Use `img` command to send pages as images."
-                return f"📄 **{path.name}** ({len(text)} chars):\n\n{text[:8000]}"
+                page_count, pages = self.pdf_cache.read_pages(path, page_spec)
+            except ValueError as e:
+                return f"❌ {e}. Use e.g. `read {file_path} 3-7` or `read {file_path} 2,9-11`."
             except Exception as e:
                 return f"❌ PDF read error: {e}"
+            if not pages:
+                return f"⚠️ No such pages — {path.name} has {page_count} pages."
+
+            text = "\n".join(f"## Page {num}\n\n{page_text}" for num, page_text in pages if page_text.strip())
+            if not text.strip():
+                return ("⚠️ PDF appears to be scanned (no extractable text). Drop it in 00_inbox to OCR it "
+                        "during ingest, or use the `img` command to send pages as images.")
+            # Label what was actually returned — reading stops at the char limit
+            returned = [num for num, _ in pages]
+            shown = f"page{'s' if len(returned) > 1 else ''} {format_page_spec(returned)}"
+            shown += f" of {page_count}"
+            cut = len(text) > READ_CHAR_LIMIT
+            if cut:
+                shown += f", page {returned[-1]} cut short"
+            result = f"📄 **{path.name}** ({shown}, {len(text)} chars):\n\n{text[:READ_CHAR_LIMIT]}"
+            requested = [i + 1 for i in parse_page_spec(page_spec, page_count)] if page_spec \
+                else list(range(1, page_count + 1))
+            remaining = [num for num in requested if num > returned[-1] or (cut and num == returned[-1])]
+            if remaining:
+                result += f"\n\n💡 More: `read {file_path} {format_page_spec(remaining)}`"
+            return result
 
         # Images → route to vision brain
         if ext in IMAGE_EXTS:
             return None  # Signal to caller: use vision routing instead
 
-        # Code files → direct read
+        # Code files → whole file if small, else outline + opening slice; `file:symbol` for one definition
         if ext in CODE_EXTS:
             print(f"\n💻 Reading code file...", end="", flush=True)
             try:
-                with open(path, "r", encoding="utf-8") as f:
-                    content = f.read()
-                return f"💻 **{path.name}** ({len(content.splitlines())} lines):\n\n```{ext[1:]}\n{content}\n```"
+                content, symbols = self.outline_cache.load(path)
             except Exception as e:
                 return f"❌ Read error: {e}"
+            lines = content.splitlines()
+            if symbol:
+                return self.read_symbol(file_path, path, lines, symbols, symbol)
+            header = f"💻 **{path.name}** ({len(lines)} lines, {len(content)} chars)"
+            if len(content) <= READ_CHAR_LIMIT:
+                return f"{header}:\n\n```{ext[1:]}\n{content}\n```"
+
+            # The outline gets at most half the budget; the opening lines fill what is left
+            outline = format_outline(symbols, max_chars=READ_CHAR_LIMIT // 2) if symbols else "  (no symbols found)"
+            hint = (f"`read {file_path}:<symbol>` for one definition" if symbols
+                    else f"`scan` or a smaller file — {path.name} has no outline")
+            prefix = f"{header} — too big to send whole. Outline ({len(symbols)} symbols):\n\n{outline}\n\n"
+            suffix = f"\n```\n\n💡 More: {hint}"
+            frame = len(prefix) + len(suffix) + len(f"Lines 1-{len(lines)}:\n\n```{ext[1:]}\n")
+            opening = content[:max(0, READ_CHAR_LIMIT - frame)]
+            opening = opening[:opening.rfind("\n")] if "\n" in opening else opening
+            return f"{prefix}Lines 1-{len(opening.splitlines())}:\n\n```{ext[1:]}\n{opening}{suffix}"
 
         # Text/markdown → direct read
         if ext in TEXT_EXTS:
@@ -204,41 +889,94 @@ class HybridTutor:
 
         return f"⚠️ Unknown file type: {ext}. Supported: PDF, images, code, text/markdown."
 
-    def scan_workspace(self):
-        """List all files in the active lab."""
-        if not WORK_DIR.exists():
-            return "⚠️ No workspace found. Run `py scripts/ingest.py` first."
+    def read_symbol(self, file_path, path, lines, symbols, symbol):
+        """One definition from a code file, capped like every other read."""
+        matches = find_symbol(symbols, symbol)
+        if not matches:
+            outline = format_outline(symbols, max_chars=READ_CHAR_LIMIT - 200) if symbols else "  (no symbols found)"
+            return f"⚠️ No symbol '{symbol}' in {file_path}. Outline:\n\n{outline}"
+        if len(matches) > 1 and matches[0]["name"] != symbol:
+            return (f"⚠️ '{symbol}' matches several symbols in {file_path} — `read {file_path}:<name>` "
+                    f"with one of:\n\n{format_outline(matches, max_chars=READ_CHAR_LIMIT - 200)}")
+        found = matches[0]
+        body = "\n".join(lines[found["start"] - 1:found["end"]])
+        note = ""
+        if len(body) > READ_CHAR_LIMIT:
+            body = body[:READ_CHAR_LIMIT]
+            note = f"\n\n⚠️ Cut at {READ_CHAR_LIMIT} chars."
+        return (f"💻 **{path.name}** → {found['kind']} {found['name']} (lines {found['start']}-{found['end']}):\n\n"
+                f"```{path.suffix[1:]}\n{body}\n```{note}")
 
-        output = ["\n📂 Workspace Files:"]
-        output.append("─" * 40)
+    def file_category(self, ext):
+        if ext in CODE_EXTS:
+            return "code", "💻"
+        if ext in TEXT_EXTS:
+            return "text", "📝"
+        if ext in IMAGE_EXTS:
+            return "image", "🖼️"
+        if ext == '.pdf':
+            return "pdf", "📄"
+        return "other", "📎"
 
-        file_counts = {"code": 0, "text": 0, "image": 0, "pdf": 0, "other": 0}
+    def scan_workspace(self, pattern="", page=1):
+        """List files in the active lab, optionally filtered, one page at a time.
 
-        for path in sorted(WORK_DIR.rglob("*")):
-            if path.is_dir() or path.name.startswith("."):
-                continue
-            rel = path.relative_to(WORK_DIR)
-            ext = path.suffix.lower()
-
-            if ext in CODE_EXTS:
-                icon, file_counts["code"] = "💻", file_counts["code"] + 1
-            elif ext in TEXT_EXTS:
-                icon, file_counts["text"] = "📝", file_counts["text"] + 1
-            elif ext in IMAGE_EXTS:
-                icon, file_counts["image"] = "🖼️", file_counts["image"] + 1
-            elif ext == '.pdf':
-                icon, file_counts["pdf"] = "📄", file_counts["pdf"] + 1
-            else:
-                icon, file_counts["other"] = "📎", file_counts["other"] + 1
+        `pattern` is a category (code, text, image, pdf, other), a glob such
+        as `*.js`, or a plain substring of the path.
+        """
+        self.workspace.refresh()
+        files = self.workspace.files()
+        if not files:  # WORK_DIR itself always exists: it holds the hidden .cache/
+            return "⚠️ No workspace found. Run `py scripts/ingest.py` first."
 
-            output.append(f"  {icon} {rel}")
+        file_counts = {"code": 0, "text": 0, "image": 0, "pdf": 0, "other": 0}
+        matches = []
+        pattern = pattern.lower()
+        for rel in files:
+            category, icon = self.file_category(Path(rel).suffix.lower())
+            if pattern:
+                if pattern in file_counts:
+                    if category != pattern:
+                        continue
+                elif any(c in pattern for c in "*?["):
+                    if not fnmatch.fnmatch(rel.lower(), pattern) and not fnmatch.fnmatch(Path(rel).name.lower(), pattern):
+                        continue
+                elif pattern not in rel.lower():
+                    continue
+            file_counts[category] += 1
+            matches.append(f"  {icon} {rel}")
+
+        pages = max(1, -(-len(matches) // SCAN_PAGE_SIZE))
+        page = min(max(page, 1), pages)
+        title = f"Workspace Files matching '{pattern}'" if pattern else "Workspace Files"
+        output = [f"\n📂 {title} (page {page}/{pages}):"]
+        output.append("─" * 40)
+        output.extend(matches[(page - 1) * SCAN_PAGE_SIZE:page * SCAN_PAGE_SIZE])
 
         output.append(f"\n{'─' * 40}")
         summary = " | ".join(f"{v} {k}" for k, v in file_counts.items() if v > 0)
-        output.append(f"  Total: {summary}")
+        output.append(f"  Total: {summary or 'no files'}")
+        if page < pages:
+            output.append(f"  ➡️ Next page: `scan {pattern + ' ' if pattern else ''}{page + 1}`")
         output.append("\n💡 Use `read <path>` to load any file into the conversation.")
         return "\n".join(output)
 
+    def parse_scan_command(self, user_input):
+        """Parse 'scan [filter] [page]' — returns (filter, page) or None.
+
+        The filter is a single token, so "scan line algorithm explained" is a
+        question, not a listing.
+        """
+        tokens = user_input.split()
+        if not tokens or tokens[0].lower() != "scan":
+            return None
+        page = 1
+        if len(tokens) > 1 and tokens[-1].isdigit():
+            page = int(tokens.pop())
+        if len(tokens) > 2:
+            return None
+        return " ".join(tokens[1:]), page
+
     # ── Input Routing ────────────────────────────────────────────
 
     def parse_img_command(self, user_input):
@@ -288,20 +1026,44 @@ class HybridTutor:
         print(f"│ Mode:         {mode_label}")
         print(f"│ Text Brain:   {CLOUD_MODEL if self.mode == 'cloud' else LOCAL_TEXT_MODEL}")
         print(f"│ Vision Brain: {CLOUD_MODEL if self.mode == 'cloud' else LOCAL_VISION_MODEL}")
+        print(f"│ Quick Brain:  {LOCAL_SMALL_MODEL} (questions ≤ {SHORT_PROMPT_TOKENS} tokens, "
+              f"whole prompt ≤ {SMALL_MODEL_MAX_TOKENS}, local mode)")
+        print(f"│ Routing:      prompts ≥ {LARGE_CONTEXT_TOKENS} tokens → best measured tok/s;"
+              f" slow or failing brains fall back")
+        if self.router.last_route:
+            model, reason = self.router.last_route
+            print(f"│ Last route:   {model} — {reason}")
+        models = [LOCAL_SMALL_MODEL, LOCAL_TEXT_MODEL] + ([CLOUD_MODEL] if self.gemini_chat else [])
+        for model in models:
+            print(f"│   {model:<18} {self.router.describe(model)}")
+        for model, state in self.warmup.items():
+            loaded = f" (loaded in {self.format_time(state['load_time'])})" if state["load_time"] else ""
+            print(f"│ Warm-up:      {model} {state['status']}{loaded}")
         print(f"└─────────────────────────────────────")
 
     def show_help(self):
         print("\n💡 Commands:")
         print("  read <path>           → Smart-read a file (PDF, code, text)")
-        print("  scan                  → List all files in your workspace")
+        print("  read <file.pdf> <pages> → Read only some pages, e.g. 3-7 or 2,9-11")
+        print("  read <file>:<symbol>  → Read one function, class, CSS selector or JSON key")
+        print("  scan [filter] [page]  → List workspace files (filter: pdf, code, *.js, name...)")
         if self.mode != "no-ai":
             print("  (just type)           → Ask any text/code question")
             print("  img <path> <question> → Send an image to the vision brain")
+            print("  img <dir|glob> <question> → Ask about many images; report saved, resumable")
             print("  RESCUE                → Get full working solution immediately")
             print("  switch                → Toggle Cloud ↔ Local mode")
+            print("  stream                → Toggle streaming token output")
+            print("  cache [on|off|clear]  → Show, bypass or clear cached image/file answers")
+            print("  stop [id]             → Stop the answer being generated (or Ctrl+C), or queued job #id")
         else:
             print("  connect               → Connect to an AI brain")
+        print("  jobs                  → Show running and queued background jobs")
+        print("  sessions              → List saved conversations")
+        print("  resume [id]           → Continue a saved conversation (latest by default)")
+        print("  ingest                → Run the ingest pipeline in the background")
         print("  models                → Show active model configuration")
+        print("  stats                 → Latency p50/p95 and tokens/sec per brain this session")
         print("  help                  → Show this help")
         print("  quit                  → Exit the tutor")
 
@@ -310,11 +1072,297 @@ class HybridTutor:
             return f"{int(elapsed // 60)}m {int(elapsed % 60)}s"
         return f"{elapsed:.1f}s"
 
+    # ── Sessions ─────────────────────────────────────────────────
+
+    def file_ref(self, read_path, chars):
+        """(workspace-relative path, content hash, chars read) for the file behind a `read`, or None."""
+        path = self.resolve_path(self.split_symbol(self.split_page_spec(read_path)[0])[0])
+        if path is None or not path.is_file():
+            return None
+        path = path.resolve()
+        shown = path.relative_to(WORK_DIR.resolve()) if path.is_relative_to(WORK_DIR.resolve()) else path
+        return str(shown), file_hash(path), chars
+
+    def record_exchange(self, user_input, response, summary=None, file_ref=None):
+        """Add a question/answer pair to the history and to the on-disk session."""
+        self.history.append('user', user_input)
+        self.history.append('assistant', response, summary=summary)
+        if self.cloud_chat_stale and self.gemini_chat:
+            self.gemini_chat = self.new_cloud_chat()
+        self.cloud_chat_stale = False
+        with self.session_lock:
+            if self.session_id is None:
+                self.session_id = self.sessions.create(self.mode, user_input)
+            self.sessions.append(self.session_id, 'user', user_input)
+            self.sessions.append(self.session_id, 'assistant', response, summary=summary)
+            if file_ref:
+                self.sessions.add_file(self.session_id, *file_ref)
+
+    def resume_session(self, arg=""):
+        """Load a stored session (latest by default) into the history and reseed the cloud chat."""
+        arg = arg.strip().lstrip("#")
+        if arg and not arg.isdigit():
+            print("\n⚠️ Usage: resume [session id] — `sessions` lists them.")
+            return False
+        session_id = int(arg) if arg else self.sessions.latest()
+        session = self.sessions.get(session_id) if session_id else None
+        if session is None:
+            print(f"\n⚠️ No saved session{f' #{arg}' if arg else 's'} to resume.")
+            return False
+
+        start_time = time.time()
+        turns = self.sessions.turns(session_id)
+        self.history.clear()
+        for turn in turns:
+            # Summarized turns (file dumps) come back as their summary only
+            self.history.append(turn["role"], turn["summary"] or turn["content"], summary=turn["summary"])
+        self.session_id = session_id
+        if self.gemini_chat:
+            self.gemini_chat = self.new_cloud_chat()
+
+        exchanges = len(turns) // 2
+        print(f"\n🔁 Resumed session #{session_id} \"{session['title']}\" — {exchanges} turn{'' if exchanges == 1 else 's'}, "
+              f"≈{self.history.token_estimate()} tokens of context ({self.format_time(time.time() - start_time)})")
+        for path, content_hash, chars in self.sessions.files(session_id):
+            current = self.resolve_path(path)
+            if current is None:
+                note = "missing"
+            elif file_hash(current) != content_hash:
+                note = "changed since — `read` it again for the new version"
+            else:
+                note = "unchanged"
+            print(f"   📎 {path} ({chars} chars, {note})")
+        return True
+
+    def show_sessions(self):
+        rows = self.sessions.recent()
+        if not rows:
+            print("\n🗂️ No saved sessions yet.")
+            return
+        print("\n🗂️ Recent sessions (`resume <id>` to continue one):")
+        for session_id, updated, mode, title, turns in rows:
+            current = " ← current" if session_id == self.session_id else ""
+            when = time.strftime("%Y-%m-%d %H:%M", time.localtime(updated))
+            print(f"  #{session_id:<4} {when}  {mode:<6} {turns // 2:>3} turns  {title}{current}")
+
+    # ── Turns & Jobs ─────────────────────────────────────────────
+
+    def route_turn(self, user_input):
+        """Pick the brain call for an `img` or text turn. Returns a blocking callable."""
+        if self.mode == "no-ai":
+            if self.parse_img_command(user_input):
+                return lambda: "⚠️ AI not connected. Type 'connect' to activate a brain for image analysis."
+            return lambda: "⚠️ AI not connected. Type 'connect' to activate a brain, or use 'read' and 'scan' to browse files."
+
+        img_command = self.parse_img_command(user_input)
+        if img_command:
+            img_path, question = img_command
+            if Path(img_path).is_dir() or (WORK_DIR / img_path).is_dir() \
+                    or any(c in img_path for c in "*?["):
+                return lambda: self.run_vision_batch(img_path, question)
+            if self.mode == "cloud":
+                return lambda: self.chat_vision_cloud(img_path, question)
+            return lambda: self.chat_vision_local(img_path, question)
+
+        return lambda: self.chat_text(user_input, stream=self.stream)
+
+    def run_turn(self, user_input, compute, kind=None):
+        """Time one model turn, print the answer and record it (runs in a worker thread)."""
+        cancel = self.cancel_event
+        start_time = time.time()
+        self.stream_stats = None
+        self.turn_load_time = 0.0
+        turn = self.telemetry.begin(kind or ("vision" if self.parse_img_command(user_input) else "text"),
+                                    self.mode)
+        try:
+            response = compute()
+        except Exception as e:
+            self.telemetry.finish(turn, "error")
+            print(f"❌ Error: {e}")
+            return
+        if cancel.is_set():
+            self.telemetry.finish(turn, "stopped")
+            if not (self.stream_stats and self.stream_stats["ttft"] is not None):
+                return  # Stopped before anything was shown
+        else:
+            self.telemetry.finish(turn)
+
+        elapsed = time.time() - start_time
+        if self.stream_stats:
+            print(self.format_stream_stats(elapsed))  # Tokens were already printed
+        else:
+            print(f" done ({self.format_time(elapsed)}){self.format_load_note()}")
+            print(f"\nTutor: {response}")
+        self.print_breakdown(turn)
+        self.record_exchange(user_input, response)
+
+    def print_breakdown(self, turn):
+        breakdown = self.telemetry.breakdown(turn)
+        if breakdown:
+            print(f"   ↳ {breakdown}")
+
+    def show_stats(self):
+        """Per-brain latency percentiles and tokens/sec for this session."""
+        rows = self.telemetry.summary()
+        if not rows:
+            print(f"\n📈 No answered turns yet this session. (Metrics log: {METRICS_PATH})")
+            return
+        print("\n📈 Session stats:")
+        print(f"  {'Brain':<22} {'Turns':>5} {'p50':>8} {'p95':>8} {'1st tok':>8} {'tok/s':>7}")
+        for brain, turns, p50, p95, ttft, rate in rows:
+            print(f"  {brain:<22} {turns:>5} {format_seconds(p50):>8} {format_seconds(p95):>8} "
+                  f"{format_seconds(ttft) if ttft is not None else '—':>8} "
+                  f"{f'{rate:.1f}' if rate else '—':>7}")
+        medians = self.telemetry.stage_medians()
+        if medians:
+            print("  Median stage times: " + " · ".join(
+                f"{label} {format_seconds(seconds)}" for label, seconds in medians.items()))
+        print(f"  Metrics log: {METRICS_PATH}")
+
+    async def model_job(self, job, work):
+        """Run blocking model work in a thread, one job at a time.
+
+        Cancelling the task sets the job's cancel event: streams stop at the
+        next chunk, other calls run to completion and their answer is dropped.
+        The lock is held until the thread is done, so turns never overlap.
+        """
+        async with self.model_lock:
+            job["state"] = "running"
+            self.cancel_event = cancel = threading.Event()
+            future = asyncio.ensure_future(asyncio.to_thread(work))
+            try:
+                return await asyncio.shield(future)
+            except asyncio.CancelledError:
+                cancel.set()
+                job["state"] = "stopping"
+                print(f"\n⏹️ Stopped #{job['id']}: {job['label']}")
+                await asyncio.wait([future])
+                raise
+
+    async def answer_job(self, job, user_input):
+        await self.model_job(job, lambda: self.run_turn(user_input, self.route_turn(user_input)))
+
+    async def read_job(self, job, user_input, read_path):
+        """Read a file off the event loop; the AI summary queues behind other model jobs."""
+        start_time = time.time()
+        turn = self.telemetry.begin("read", self.mode)
+        with self.telemetry.stage("file_read"):
+            result = await asyncio.to_thread(self.read_file, read_path)
+        if result is None:
+            # Image file — route to vision
+            if self.mode == "no-ai":
+                compute = lambda: "⚠️ AI not connected. Type 'connect' to activate a brain for image analysis."
+            elif self.mode == "cloud":
+                compute = lambda: self.chat_vision_cloud(read_path, "Describe this image")
+            else:
+                compute = lambda: self.chat_vision_local(read_path, "Describe this image")
+            job["state"] = "queued"
+            await self.model_job(job, lambda: self.run_turn(user_input, compute, kind="vision"))
+            return  # run_turn records the vision turn itself
+
+        file_ref = None if result.startswith("❌") else await asyncio.to_thread(self.file_ref, read_path, len(result))
+
+        print(f"\n📖 {read_path} ({self.format_time(time.time() - start_time)})")
+        print(f"\nTutor: {result}")
+        response = result
+        # File dumps age out of history as a reference + summary
+        summary = f"[Loaded {read_path} ({len(result)} chars) — `read` it again for the full text.]"
+        status = "stopped"
+        try:
+            # Add AI summary if connected
+            if self.mode != "no-ai" and not result.startswith("❌") and not result.startswith("⚠️"):
+                job["state"], job["label"] = "queued", f"summary of {read_path}"
+                ai_response = await self.model_job(job, lambda: self.summarize_file(result))
+                print(f"\n{'─' * 40}\n🤖 AI Summary ({read_path}):\n{ai_response}")
+                response = f"{result}\n\n{'─' * 40}\n🤖 AI Summary:\n{ai_response}"
+                summary += f"\n🤖 AI Summary:\n{ai_response}"
+            status = "ok"
+        finally:
+            self.telemetry.finish(turn, status)
+            if status == "ok":
+                self.print_breakdown(turn)
+            self.record_exchange(user_input, response, summary=summary, file_ref=file_ref)
+
+    async def ingest_job(self, job):
+        """Run scripts/ingest.py as a subprocess; its output goes to a log file."""
+        INGEST_LOG_PATH.parent.mkdir(parents=True, exist_ok=True)
+        env = dict(os.environ, PYTHONIOENCODING="utf-8")
+        with open(INGEST_LOG_PATH, "w", encoding="utf-8") as log:
+            process = await asyncio.create_subprocess_exec(
+                sys.executable, str(INGEST_SCRIPT), stdout=log, stderr=asyncio.subprocess.STDOUT, env=env)
+            try:
+                code = await process.wait()
+            except asyncio.CancelledError:
+                process.terminate()
+                print(f"\n⏹️ Ingest stopped → {INGEST_LOG_PATH}")
+                raise
+
+        lines = INGEST_LOG_PATH.read_text(encoding="utf-8").splitlines()
+        done = next((line for line in reversed(lines) if line.startswith("✅ Done")), None)
+        if code == 0:
+            print(f"\n📥 Ingest finished: {done or 'nothing to do'} → {INGEST_LOG_PATH}")
+        else:
+            print(f"\n❌ Ingest failed (exit {code}) → {INGEST_LOG_PATH}")
+
+    def start_job(self, kind, label, factory, state="running"):
+        """Schedule factory(job) as a task and track it in self.jobs."""
+        job = {"id": next(self.job_ids), "kind": kind, "label": label,
+               "state": state, "started": time.time()}
+        job["task"] = asyncio.create_task(factory(job))
+        self.jobs[job["id"]] = job
+        job["task"].add_done_callback(lambda task: self.finish_job(job, task))
+        return job
+
+    def finish_job(self, job, task):
+        if self.jobs.pop(job["id"], None) is None:
+            return  # Cancelled on quit
+        if task.cancelled() and job["state"] == "queued":
+            print(f"\n⏹️ Cancelled #{job['id']}: {job['label']}")
+        elif not task.cancelled() and task.exception():
+            print(f"\n❌ Error in #{job['id']} ({job['label']}): {task.exception()}")
+        self.show_prompt()
+
+    def stop_jobs(self, arg=""):
+        """Cancel job #arg, or the running model job when no id is given. Returns how many.
+
+        Queued questions are left alone unless named: Ctrl+C only stops what's generating.
+        """
+        if arg:
+            job = self.jobs.get(int(arg.lstrip("#"))) if arg.lstrip("#").isdigit() else None
+            targets = [job] if job else []
+        else:
+            targets = [job for job in self.jobs.values() if job["kind"] != "ingest" and job["state"] == "running"]
+        for job in targets:
+            job["task"].cancel()
+        return len(targets)
+
+    def show_jobs(self):
+        if not self.jobs:
+            print("\n⚙️ No background jobs.")
+            return
+        print("\n⚙️ Jobs:")
+        for job in self.jobs.values():
+            label = job["label"] if len(job["label"]) <= 50 else job["label"][:47] + "..."
+            elapsed = self.format_time(time.time() - job["started"])
+            print(f"  #{job['id']:<3} {job['kind']:<7} {job['state']:<8} {elapsed:>7}  {label}")
+
+    def show_prompt(self):
+        print("\nYou: ", end="", flush=True)
+
+    def interrupt(self):
+        """Ctrl+C: stop the current generation instead of exiting."""
+        if not self.stop_jobs():
+            print("\n(Nothing running — type 'quit' to exit.)")
+            self.show_prompt()
+
     # ── Main Loop ────────────────────────────────────────────────
 
-    def connect_brain(self):
+    def connect_brain(self, choice=None):
         """Brain selection menu — can be called at startup or via 'connect' command."""
-        choice = input("Select Brain: [1] Gemini Flash (Cloud)  [2] Llama + Moondream (Local)  [3] No AI (Files Only): ")
+        if choice is None:
+            mark_phase("menu + startup banner")
+            choice = input(BRAIN_MENU)
+            mark_phase("waiting for brain choice")
         if choice == '1':
             if self.setup_gemini():
                 self.mode = "cloud"
@@ -329,8 +1377,10 @@ class HybridTutor:
         else:
             self.mode = "local"
             print(f"✅ Connected to Local (Text: {LOCAL_TEXT_MODEL} | Vision: {LOCAL_VISION_MODEL}).")
+        if self.mode == "local":
+            self.start_warmup()
 
-    def start(self):
+    def start(self, profile_startup=False, resume=None):
         print("🤖 Antigravity Tutor (Smart Engine v2)")
         print("   Text Brain  → code & reasoning")
         print("   Vision Brain → images, OCR, screenshots")
@@ -339,94 +1389,134 @@ class HybridTutor:
         self.connect_brain()
 
         self.show_help()
+        if resume is not None:
+            self.resume_session(resume)
+        mark_phase(f"connect ({self.mode})")
+        if profile_startup:
+            print_startup_profile()
 
+        asyncio.run(self.repl())
+
+    async def repl(self):
+        """Async command loop: model calls, reads and ingest run as tasks while input stays live."""
+        loop = asyncio.get_running_loop()
+        self.model_lock = asyncio.Lock()
+        lines = asyncio.Queue()
+        want_line = threading.Event()  # Only block on stdin when the loop asks, so quit exits cleanly
+
+        def read_console():
+            while True:
+                want_line.wait()
+                want_line.clear()
+                try:
+                    line = input()
+                except EOFError:
+                    line = None
+                loop.call_soon_threadsafe(lines.put_nowait, line)
+
+        async def next_line():
+            want_line.set()
+            return await lines.get()
+
+        threading.Thread(target=read_console, daemon=True).start()
+        signal.signal(signal.SIGINT, lambda *_: loop.call_soon_threadsafe(self.interrupt))
+
+        self.show_prompt()
         while True:
-            user_input = input("\nYou: ").strip()
+            user_input = await next_line()
+            if user_input is None:
+                user_input = "quit"
+            user_input = user_input.strip()
             if not user_input:
+                self.show_prompt()
                 continue
-            if user_input.lower() in ['quit', 'exit']:
+            command = user_input.lower()
+
+            if command in ['quit', 'exit']:
+                for job in self.jobs.values():
+                    job["task"].cancel()
+                self.jobs.clear()
+                await asyncio.to_thread(self.release_models)
                 print("👋 See you next time!")
                 break
-            if user_input.lower() in ['switch', 'connect']:
+            if command in ['switch', 'connect']:
                 if self.mode == "no-ai":
-                    self.connect_brain()
+                    print(BRAIN_MENU, end="", flush=True)
+                    choice = await next_line()
+                    await asyncio.to_thread(self.connect_brain, (choice or "").strip())
                 elif self.mode == "local":
-                    if self.setup_gemini():
+                    if await asyncio.to_thread(self.setup_gemini):
                         self.mode = "cloud"
                     else:
                         print("⚠️ Could not connect to cloud. Staying local.")
+                        self.show_prompt()
                         continue
                 else:
                     self.mode = "local"
+                    self.start_warmup()
                 if self.mode not in ["no-ai"]:
                     print(f"🔄 Switched to {self.mode.upper()} mode.")
                 self.show_models()
-                continue
-            if user_input.lower() == 'models':
+            elif command == 'models':
                 self.show_models()
-                continue
-            if user_input.lower() == 'help':
+            elif command == 'stats':
+                self.show_stats()
+            elif command == 'sessions':
+                self.show_sessions()
+            elif re.fullmatch(r"resume( #?\d+)?", command):
+                if any(job["kind"] in ("answer", "read") for job in self.jobs.values()):
+                    print("\n⏳ Finish or `stop` the running answers before resuming a session.")
+                else:
+                    await asyncio.to_thread(self.resume_session, user_input[6:])
+            elif re.fullmatch(r"cache( on| off| clear)?", command):
+                self.cache_command(command[5:].strip())
+            elif command == 'stream':
+                self.stream = not self.stream
+                print(f"🔄 Streaming output {'ON' if self.stream else 'OFF'}.")
+            elif command == 'help':
                 self.show_help()
+            elif command == 'jobs':
+                self.show_jobs()
+            elif re.fullmatch(r"stop( #?\d+)?", command):
+                if not self.stop_jobs(command[4:].strip()):
+                    print("\n⚠️ Nothing to stop.")
+            elif command == 'ingest':
+                if any(job["kind"] == "ingest" for job in self.jobs.values()):
+                    print("\n⏳ Ingest is already running — see 'jobs'.")
+                else:
+                    job = self.start_job("ingest", "ingest 00_inbox", self.ingest_job)
+                    print(f"\n📥 Ingest started in the background (#{job['id']}).")
+                    continue
+            elif self.parse_scan_command(user_input):
+                print(self.scan_workspace(*self.parse_scan_command(user_input)))
+            elif self.parse_read_command(user_input):
+                read_path = self.parse_read_command(user_input)
+                self.start_job("read", f"read {read_path}",
+                               lambda job: self.read_job(job, user_input, read_path))
                 continue
-            if user_input.lower() == 'scan':
-                print(self.scan_workspace())
+            else:
+                busy = any(job["kind"] in ("answer", "read") for job in self.jobs.values())
+                job = self.start_job("answer", user_input, lambda job: self.answer_job(job, user_input),
+                                     state="queued")
+                if busy:
+                    print(f"\n⏳ Queued as #{job['id']} — 'jobs' shows progress, 'stop {job['id']}' cancels it.")
+                    self.show_prompt()
                 continue
+            self.show_prompt()
 
-            try:
-                start_time = time.time()
-
-                # ── Read command routing ──
-                read_path = self.parse_read_command(user_input)
-                if read_path:
-                    result = self.read_file(read_path)
-                    if result is None:
-                        # Image file — route to vision
-                        if self.mode == "no-ai":
-                            response = "⚠️ AI not connected. Type 'connect' to activate a brain for image analysis."
-                        elif self.mode == "cloud":
-                            response = self.chat_vision_cloud(read_path, "Describe this image")
-                        else:
-                            response = self.chat_vision_local(read_path, "Describe this image")
-                    else:
-                        response = result
-                        # Add AI summary if connected
-                        if self.mode != "no-ai" and not response.startswith("❌") and not response.startswith("⚠️"):
-                            if self.mode == "cloud":
-                                ai_response = self.chat_cloud(f"I just loaded this file. Here's the content:\n\n{response}\n\nGive me a brief summary of what this file does.")
-                            else:
-                                ai_response = self.chat_local(f"I just loaded this file. Here's the content:\n\n{response}\n\nGive me a brief summary of what this file does.")
-                            response = f"{response}\n\n{'─' * 40}\n🤖 AI Summary:\n{ai_response}"
-
-                # ── Vision routing ──
-                elif self.parse_img_command(user_input):
-                    if self.mode == "no-ai":
-                        response = "⚠️ AI not connected. Type 'connect' to activate a brain for image analysis."
-                    else:
-                        img_path, question = self.parse_img_command(user_input)
-                        if self.mode == "cloud":
-                            response = self.chat_vision_cloud(img_path, question)
-                        else:
-                            response = self.chat_vision_local(img_path, question)
-
-                # ── Text routing ──
-                else:
-                    if self.mode == "no-ai":
-                        response = "⚠️ AI not connected. Type 'connect' to activate a brain, or use 'read' and 'scan' to browse files."
-                    elif self.mode == "cloud":
-                        response = self.chat_cloud(user_input)
-                    else:
-                        response = self.chat_local(user_input)
-
-                elapsed = time.time() - start_time
-                print(f" done ({self.format_time(elapsed)})")
-                print(f"\nTutor: {response}")
-                self.history.append({'role': 'user', 'content': user_input})
-                self.history.append({'role': 'assistant', 'content': response})
 
-            except Exception as e:
-                print(f"❌ Error: {e}")
+def parse_args():
+    parser = argparse.ArgumentParser(description="Hybrid local/cloud study tutor.")
+    parser.add_argument("--profile-startup", action="store_true",
+                        help="Print where startup time goes (phases and deferred imports)")
+    parser.add_argument("--resume", nargs="?", const="", metavar="ID",
+                        help="Continue a saved session (the latest one if no ID is given)")
+    return parser.parse_args()
 
 
 if __name__ == "__main__":
+    args = parse_args()
+    mark_phase("module setup")
     app = HybridTutor()
-    app.start()
+    mark_phase("tutor init")
+    app.start(profile_startup=args.profile_startup, resume=args.resume)
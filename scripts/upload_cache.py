@@ -0,0 +1,67 @@
+import json
+import threading
+import time
+from pathlib import Path
+
+UPLOAD_TTL = 48 * 3600       # Gemini deletes uploaded files after 48 hours
+EXPIRY_MARGIN = 10 * 60      # Don't hand out a handle that is about to expire
+
+
+class UploadCache:
+    """Content hash → uploaded-file handle map for the Gemini files API.
+
+    Persisted as JSON so handles survive restarts. Entries are dropped once
+    they are within EXPIRY_MARGIN of the server-side expiration time.
+    Safe to share between the threads of a cloud batch.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self.lock = threading.RLock()  # get() → forget() → save() re-enter it
+        self.entries = {}
+        if self.path.exists():
+            try:
+                with open(self.path, "r", encoding="utf-8") as f:
+                    self.entries = json.load(f)
+            except (OSError, ValueError):
+                self.entries = {}
+
+    def save(self):
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = self.path.with_suffix(".tmp")
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump(self.entries, f, indent=2)
+            tmp_path.replace(self.path)
+
+    def get(self, content_hash):
+        """The live handle for content_hash ({"name", "uri", "mime_type", "expires"}) or None."""
+        with self.lock:
+            entry = self.entries.get(content_hash)
+            if entry and entry["expires"] - EXPIRY_MARGIN > time.time():
+                return entry
+            if entry:
+                self.forget(content_hash)
+            return None
+
+    def put(self, content_hash, uploaded):
+        """Remember a File returned by files.upload()."""
+        expiration = getattr(uploaded, "expiration_time", None)
+        expires = expiration.timestamp() if expiration else time.time() + UPLOAD_TTL
+        entry = {"name": uploaded.name, "uri": uploaded.uri,
+                 "mime_type": uploaded.mime_type, "expires": expires}
+        with self.lock:
+            self.entries[content_hash] = entry
+            self.prune()
+            self.save()
+        return entry
+
+    def forget(self, content_hash):
+        with self.lock:
+            if self.entries.pop(content_hash, None) is not None:
+                self.save()
+
+    def prune(self):
+        now = time.time()
+        with self.lock:
+            self.entries = {k: v for k, v in self.entries.items() if v["expires"] - EXPIRY_MARGIN > now}
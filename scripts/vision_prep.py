@@ -0,0 +1,124 @@
+import os
+import time
+from pathlib import Path
+
+# --- CONFIGURATION ---
+# Longest image side each vision model actually looks at; larger inputs are
+# downscaled by the model anyway, so we do it once up front.
+VISION_INPUT_SIZES = {
+    "moondream": 378,
+    "llava": 672,
+    "gemini-2.0-flash": 1536,
+}
+DEFAULT_INPUT_SIZE = 1024
+JPEG_QUALITY = 85
+CROP_BORDERS = os.getenv("VISION_CROP_BORDERS", "0") == "1"
+BORDER_TOLERANCE = 12     # Max per-channel difference from the corner colour
+DERIVATIVE_DIR = ".vision"  # Hidden folder next to the source image
+
+
+def derivative_path(source, model, max_side):
+    """Cached derivative for this exact source: full file name, size and mtime are all in the key.
+
+    A replacement that keeps an older mtime (copy2, unzip, checkout) still
+    differs in size or mtime, and diagram.png / diagram.jpg never share one.
+    """
+    st = source.stat()
+    tag = f"{max_side}px{'-crop' if CROP_BORDERS else ''}"
+    return (source.parent / DERIVATIVE_DIR /
+            f"{source.name}.{model.replace(':', '_')}.{tag}.{st.st_size}-{st.st_mtime_ns:x}.jpg")
+
+
+def drop_stale_derivatives(target):
+    """Remove derivatives made from earlier versions of the same source, model and size."""
+    prefix = target.name.rsplit(".", 2)[0]
+    for old in target.parent.glob(f"{prefix}.*.jpg"):
+        if old != target and old.name.count(".") == target.name.count("."):
+            old.unlink(missing_ok=True)
+
+
+def content_bbox(pix):
+    """Bounding box (IRect) of everything that isn't the corner/border colour."""
+    import fitz
+    step = max(1, max(pix.width, pix.height) // 256)  # Sample a grid, not every pixel
+    samples, n, stride = pix.samples, pix.n, pix.stride
+    background = samples[0:n - pix.alpha]
+
+    def is_border(x, y):
+        offset = y * stride + x * n
+        pixel = samples[offset:offset + n - pix.alpha]
+        return all(abs(a - b) <= BORDER_TOLERANCE for a, b in zip(pixel, background))
+
+    xs, ys = [], []
+    for y in range(0, pix.height, step):
+        for x in range(0, pix.width, step):
+            if not is_border(x, y):
+                xs.append(x)
+                ys.append(y)
+    if not xs:
+        return fitz.IRect(pix.irect)
+    return fitz.IRect(max(0, min(xs) - step), max(0, min(ys) - step),
+                      min(pix.width, max(xs) + step), min(pix.height, max(ys) + step))
+
+
+def prepare_image(image_path, model, verbose=True):
+    """Return the path to send to `model`: a resized/compressed derivative when that helps.
+
+    Derivatives are cached under a hidden .vision/ folder next to the source,
+    keyed by its name, size and mtime, and reused until any of them changes. Falls back to the original image
+    whenever PyMuPDF is missing or the image can't be decoded (e.g. SVG).
+    """
+    source = Path(image_path)
+    try:
+        import fitz  # PyMuPDF — imported here so the tutor starts without it
+    except ImportError:
+        return str(source)
+    if source.suffix.lower() == ".svg":
+        return str(source)
+
+    max_side = VISION_INPUT_SIZES.get(model.split(":")[0], DEFAULT_INPUT_SIZE)
+    target = derivative_path(source, model, max_side)
+    if target.exists():
+        return str(target)
+
+    start = time.time()
+    try:
+        pix = fitz.Pixmap(str(source))
+        if pix.colorspace and pix.colorspace.n > 3:  # CMYK → RGB
+            pix = fitz.Pixmap(fitz.csRGB, pix)
+        if pix.alpha:
+            pix = fitz.Pixmap(pix, 0)  # JPEG has no alpha channel
+
+        original_dims = (pix.width, pix.height)
+        if CROP_BORDERS:
+            clip = content_bbox(pix)
+            if clip != fitz.IRect(pix.irect):
+                cropped = fitz.Pixmap(pix.colorspace, clip, False)
+                cropped.copy(pix, clip)
+                cropped.set_origin(0, 0)
+                pix = cropped
+
+        scale = min(1.0, max_side / max(pix.width, pix.height))
+        if scale == 1.0 and (pix.width, pix.height) == original_dims and source.suffix.lower() in (".jpg", ".jpeg"):
+            return str(source)  # Already small enough and already compressed
+
+        width, height = max(1, round(pix.width * scale)), max(1, round(pix.height * scale))
+        resized = fitz.Pixmap(pix, width, height) if scale < 1.0 else pix
+        data = resized.tobytes("jpeg", jpg_quality=JPEG_QUALITY)
+    except Exception:
+        return str(source)
+
+    original_size = source.stat().st_size
+    if len(data) >= original_size:
+        return str(source)  # Re-encoding didn't help — send the original
+
+    target.parent.mkdir(parents=True, exist_ok=True)
+    drop_stale_derivatives(target)
+    tmp_path = target.with_name(target.name + ".tmp")
+    tmp_path.write_bytes(data)
+    tmp_path.replace(target)  # A half-written derivative must never look cached
+    if verbose:
+        print(f"\n🪄 Preprocessed for {model}: {original_dims[0]}x{original_dims[1]} → {width}x{height}, "
+              f"{original_size / 1024:.0f} KB → {len(data) / 1024:.0f} KB ({time.time() - start:.1f}s)",
+              end="", flush=True)
+    return str(target)
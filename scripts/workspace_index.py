@@ -0,0 +1,100 @@
+import json
+import os
+import time
+from pathlib import Path
+
+MTIME_SLACK = 2.0  # Seconds — coarse filesystem clocks can hide a change this close to a scan
+
+
+def is_hidden(name):
+    return name.startswith(".") or "__MACOSX" in name
+
+
+class WorkspaceIndex:
+    """Directory listing of a workspace, persisted and refreshed by directory mtime.
+
+    Adding, removing or renaming an entry bumps its parent directory's mtime,
+    so a refresh re-lists only those directories and costs one stat() for
+    every directory that did not change — no per-file stats.
+    """
+
+    def __init__(self, root, index_path):
+        self.root = Path(root)
+        self.index_path = Path(index_path)
+        self.dirs = {}  # rel dir ("" = root) → {"mtime", "scanned_at", "files": [...], "dirs": [...]}
+        self.load()
+
+    def load(self):
+        if not self.index_path.exists():
+            return
+        try:
+            with open(self.index_path, "r", encoding="utf-8") as f:
+                self.dirs = json.load(f)
+        except (OSError, ValueError):
+            self.dirs = {}
+
+    def save(self):
+        self.index_path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = self.index_path.with_suffix(".tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.dirs, f)
+        tmp_path.replace(self.index_path)
+
+    def refresh(self):
+        """Re-list directories whose mtime changed. Returns how many were re-listed."""
+        if not self.root.is_dir():
+            self.dirs = {}
+            return 0
+
+        fresh, rescanned = {}, 0
+        stack = [""]
+        while stack:
+            rel = stack.pop()
+            try:
+                mtime = os.stat(self.root / rel).st_mtime
+            except OSError:
+                continue
+            entry = self.dirs.get(rel)
+            if not entry or entry["mtime"] != mtime or entry["scanned_at"] - mtime < MTIME_SLACK:
+                entry = self.list_dir(rel, mtime)
+                rescanned += 1
+            fresh[rel] = entry
+            stack.extend(f"{rel}/{name}" if rel else name for name in entry["dirs"])
+
+        changed = rescanned or fresh.keys() != self.dirs.keys()
+        self.dirs = fresh
+        if changed:
+            self.save()
+        return rescanned
+
+    def list_dir(self, rel, mtime):
+        files, dirs = [], []
+        with os.scandir(self.root / rel) as entries:
+            for entry in entries:
+                if is_hidden(entry.name):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    dirs.append(entry.name)
+                else:
+                    files.append(entry.name)
+        return {"mtime": mtime, "scanned_at": time.time(), "files": sorted(files), "dirs": sorted(dirs)}
+
+    # ── Queries ──────────────────────────────────────────────────
+
+    def children(self, rel=""):
+        """(dirs, files) directly inside rel, sorted by name."""
+        entry = self.dirs.get(rel)
+        return (entry["dirs"], entry["files"]) if entry else ([], [])
+
+    def count_files(self, rel):
+        """Number of files anywhere under rel."""
+        dirs, files = self.children(rel)
+        return len(files) + sum(self.count_files(f"{rel}/{name}" if rel else name) for name in dirs)
+
+    def files(self):
+        """All file paths relative to the root (posix style), sorted."""
+        paths = []
+        for rel, entry in self.dirs.items():
+            prefix = f"{rel}/" if rel else ""
+            paths.extend(prefix + name for name in entry["files"])
+        return sorted(paths)